@@ -0,0 +1,107 @@
+"""
+Backup of changed files of a local working copy
+
+--------------------------------------------------------------------------------
+Import Modules """
+# standard modules
+import os
+from fnmatch import fnmatch
+from pathlib import Path
+from zipfile import ZipFile, ZIP_DEFLATED, ZIP_STORED
+
+""" --------------------------------------------------------------------------------
+Import Modules"""
+
+# Build outputs which may be excluded from a backup (matched against relative path and file name),
+# excludes are opt-in because the cleanup after the backup deletes excluded files too
+BUILD_OUTPUT_EXCLUDES = ["*.pyc", "__pycache__/*", "*/__pycache__/*", "slprj/*", "*/slprj/*", "*.slxc", "*.mexw64", "*.obj"]
+
+
+def isExcluded(relativePath: str, excludes: list) -> bool:
+    name = relativePath.rpartition("/")[2]
+    return any(fnmatch(relativePath, pattern) or fnmatch(name, pattern) for pattern in excludes)
+
+
+def iterBackupFiles(rootPath: Path, files: list):
+    """Yield existing files, folders (e.g. unversioned folders) are expanded
+
+    Args:
+        rootPath (Path): Root folder of the working copy
+        files (list): Files/folders relative to root folder or absolute
+
+    Yields:
+        tuple: (absolute path, relative posix path) or (absolute path, None) for missing files
+    """
+    seen = set()
+    for file in files:
+        file = Path(rootPath, file)
+        if file.is_dir():
+            for folder, _, fileNames in os.walk(file):
+                for fileName in fileNames:
+                    filePath = Path(folder, fileName)
+                    if filePath not in seen:
+                        seen.add(filePath)
+                        yield filePath, filePath.relative_to(rootPath).as_posix()
+        elif file not in seen:
+            seen.add(file)
+            yield file, (file.relative_to(rootPath).as_posix() if file.exists() else None)
+
+
+def createBackup(rootPath: str, files: list, backupFile: str, compressLevel: int = 6, maxBytes: int = None,
+                 excludes: list = []) -> dict:
+    """Write given files of a working copy into one zip archive (archive is opened once)
+
+    Args:
+        rootPath (str): Root folder of the working copy
+        files (list): Changed files/folders relative to root folder or absolute
+        backupFile (str): Path of zip archive, an existing archive is replaced
+        compressLevel (int, optional): Deflate level 0-9, None to store files uncompressed. Defaults to 6.
+        maxBytes (int, optional): Maximum total size of archived files, further files are skipped. Defaults to None.
+        excludes (list, optional): Glob patterns of files which are not archived, e.g. BUILD_OUTPUT_EXCLUDES. Defaults to [].
+
+    Returns:
+        dict: Archive path ('backupFile', None if nothing was archived), number of archived 'files' and 'bytes',
+              lists of 'excluded', 'skipped' (size cap) and 'missing' files
+    """
+    rootPath = Path(rootPath)
+    backupFile = Path(backupFile)
+    result = {"backupFile": backupFile, "files": 0, "bytes": 0, "excluded": [], "skipped": [], "missing": []}
+
+    compression = ZIP_STORED if compressLevel is None else ZIP_DEFLATED
+    with ZipFile(backupFile, "w", compression=compression, compresslevel=compressLevel) as zip:
+        for file, relativePath in iterBackupFiles(rootPath, files):
+            if relativePath is None:
+                result["missing"].append(file.relative_to(rootPath).as_posix())
+                continue
+            if isExcluded(relativePath, excludes):
+                result["excluded"].append(relativePath)
+                continue
+            size = file.stat().st_size
+            if maxBytes is not None and result["bytes"] + size > maxBytes:
+                result["skipped"].append(relativePath)
+                continue
+            # Content is copied in chunks
+            zip.write(file, relativePath)
+            result["files"] += 1
+            result["bytes"] += size
+
+    if result["files"] == 0:
+        backupFile.unlink(missing_ok=True)
+        result["backupFile"] = None
+    return result
+
+
+def checkBackupComplete(result: dict) -> None:
+    """Raise if files were skipped (size cap), they would be lost by a following cleanup
+
+    Args:
+        result (dict): Result of createBackup
+
+    Raises:
+        RuntimeError: Files were skipped, the archive is kept
+    """
+    if result["skipped"]:
+        raise RuntimeError(
+            f"Backup '{result['backupFile']}' is incomplete, {len(result['skipped'])} files exceed the backup size limit: "
+            + ", ".join(result["skipped"])
+        )
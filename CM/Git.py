@@ -4,15 +4,24 @@ Extended functionality for Repo class from GitPython
 --------------------------------------------------------------------------------
 Import Modules """
 # standard modules
+import io
 import os
 import sys
 import json
 import  subprocess
-from git import Repo
-from zipfile import ZipFile
+import shutil
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from git import Repo, GitCommandError
+from git.refs import SymbolicReference
+from gitdb.util import hex_to_bin
 from pathlib import Path
 from send2trash import send2trash
 
+from CM.Backup import createBackup, checkBackupComplete
+
 # dSPACE modules
 
 # customer modules
@@ -32,8 +41,228 @@ from send2trash import send2trash
 """ --------------------------------------------------------------------------------
 Import Modules"""
 
+def parseStatusPorcelainV2(output: str) -> dict:
+    """Parse output of 'git status --porcelain=v2 --branch -z'
+        https://git-scm.com/docs/git-status#_porcelain_format_version_2
+
+    Args:
+        output (str): NUL separated output of git status
+
+    Returns:
+        dict: Branch, upstream, ahead/behind counts and changed entries (short format)
+    """
+    status = {
+        "commit": "",
+        "branch": "",
+        "upstream": "",
+        "ahead": 0,
+        "behind": 0,
+        "entries": [],
+        "isDirty": False,
+    }
+    records = iter(output.split("\0"))
+    for record in records:
+        if not record:
+            continue
+        if record.startswith("# "):
+            key, _, value = record[2:].partition(" ")
+            if key == "branch.oid":
+                status["commit"] = value
+            elif key == "branch.head":
+                status["branch"] = value
+            elif key == "branch.upstream":
+                status["upstream"] = value
+            elif key == "branch.ab":
+                ahead, behind = value.split()
+                status["ahead"] = int(ahead)
+                status["behind"] = abs(int(behind))
+        elif record[0] == "1":
+            fields = record.split(" ", 8)
+            status["entries"].append(f"{fields[1].replace('.', ' ')} {fields[8]}")
+        elif record[0] == "2":
+            # Renamed or copied entry, original path follows as separate record
+            fields = record.split(" ", 9)
+            status["entries"].append(f"{fields[1].replace('.', ' ')} {next(records, '')} -> {fields[9]}")
+        elif record[0] == "u":
+            fields = record.split(" ", 10)
+            status["entries"].append(f"{fields[1]} {fields[10]}")
+        elif record[0] == "?":
+            status["entries"].append(f"?? {record[2:]}")
+
+    status["isDirty"] = bool(status["entries"])
+    return status
+
+
+def parseRemoteHeads(output: str) -> dict:
+    """Parse output of 'git ls-remote --heads'
+
+    Args:
+        output (str): Output of git ls-remote
+
+    Returns:
+        dict: Remote head revision for all branches
+    """
+    remoteHeads = {}
+    for ref in output.splitlines():
+        sha, _, refName = ref.partition("\t")
+        remoteHeads[refName.removeprefix("refs/heads/")] = sha
+    return remoteHeads
+
+
+class RemoteHeadsCache():
+    """Process wide cache of remote heads ('git ls-remote --heads') keyed by remote url"""
+    def __init__(self) -> None:
+        self._heads = {}
+        self._lock = threading.Lock()
+
+
+    def get(self, url: str, maxAge: float) -> dict:
+        """Get cached remote heads, None if not cached or older than maxAge seconds"""
+        with self._lock:
+            cached = self._heads.get(url)
+        if cached is not None and time.monotonic() - cached[0] < maxAge:
+            return cached[1]
+        return None
+
+
+    def set(self, url: str, remoteHeads: dict) -> None:
+        with self._lock:
+            self._heads[url] = (time.monotonic(), remoteHeads)
+
+
+remoteHeadsCache = RemoteHeadsCache()
+
+
+def isFullSha(revision: str) -> bool:
+    return len(revision) == 40 and all(c in "0123456789abcdef" for c in revision.lower())
+
+
+def readNulSeparated(stream, chunkSize: int = 65536):
+    """Read NUL separated fields (output of git commands with option '-z') from a binary stream
+
+    Args:
+        stream: Binary stream, e.g. stdout of a git process
+        chunkSize (int, optional): Number of bytes read at once. Defaults to 65536.
+
+    Yields:
+        str: Field decoded as UTF-8, without quoting or escaping
+    """
+    rest = b""
+    while True:
+        chunk = stream.read(chunkSize)
+        if not chunk:
+            break
+        *fields, rest = (rest + chunk).split(b"\0")
+        for field in fields:
+            yield field.decode("utf-8", errors="replace")
+    if rest:
+        yield rest.decode("utf-8", errors="replace")
+
+
+class CommitCache():
+    """Process wide cache of immutable commit facts (root commit, known commits) keyed by git directory
+
+    An entry stays valid as long as the history only grows. If the cached HEAD is no longer
+    an ancestor of the current HEAD (rebase, reset, amend), the entry is dropped.
+    Entries are never changed in place: update() stores a new entry under the lock, so an
+    entry returned by get() can be read without locking. Concurrent updates of one entry may
+    drop the facts of each other, which only costs their recomputation.
+    """
+    def __init__(self) -> None:
+        self._entries = {}
+        self._lock = threading.Lock()
+
+
+    def get(self, repo: Repo) -> dict:
+        """Get cache entry of given repository
+
+        Args:
+            repo (Repo): Repository
+
+        Returns:
+            dict: Read only entry with keys 'head', 'rootCommit' and 'knownCommits' (frozenset)
+        """
+        key = self._key(repo)
+        try:
+            head = repo.head.commit.hexsha
+        except ValueError:
+            # Repository without commits
+            head = None
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry["head"] == head:
+            return entry
+        if entry is None or not self._isFastForward(repo, entry["head"], head):
+            entry = {"head": head, "rootCommit": None, "knownCommits": frozenset()}
+        else:
+            entry = dict(entry, head=head)
+        with self._lock:
+            self._entries[key] = entry
+        return entry
+
+
+    def update(self, repo: Repo, head: str, **fields) -> None:
+        """Store facts in the cache entry of given repository
+
+        Args:
+            repo (Repo): Repository
+            head (str): HEAD the facts belong to, they are dropped if the entry has another HEAD by now
+            **fields: Facts to store, values must not be changed afterwards
+        """
+        key = self._key(repo)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry["head"] == head:
+                self._entries[key] = dict(entry, **fields)
+
+
+    @staticmethod
+    def _key(repo: Repo) -> str:
+        return os.path.normcase(os.path.abspath(repo.git_dir))
+
+
+    @staticmethod
+    def _isFastForward(repo: Repo, oldHead: str, newHead: str) -> bool:
+        if oldHead is None or newHead is None:
+            return False
+        try:
+            return repo.is_ancestor(oldHead, newHead)
+        except GitCommandError:
+            # Old head is not available anymore
+            return False
+
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+commitCache = CommitCache()
+
 
 class ExtendedGitRepo(Repo):
+    def getWorkCopyStatus(self) -> dict:
+        """Get branch, upstream, ahead/behind counts and changed entries with one git call
+
+        Returns:
+            dict: Parsed status of local working copy (see parseStatusPorcelainV2)
+        """
+        # No optional locks: status must not rewrite the index of a watched working copy
+        return parseStatusPorcelainV2(self.git(no_optional_locks=True).status("--porcelain=v2", "--branch", "-z"))
+
+
+    def getRemoteUrl(self, remote: str = "origin") -> str:
+        """Get url of given remote from repository config (no git call)
+
+        Args:
+            remote (str, optional): Remote name. Defaults to "origin".
+
+        Returns:
+            str: Remote url or empty string if remote is not configured
+        """
+        return self.config_reader("repository").get_value(f'remote "{remote}"', "url", "")
+
+
     def getRemoteHeadRev(self, branch: str = None):
         """Get revision from remote head(s)
             https://cloudaffaire.com/faq/git-ls-remote-in-gitpython/
@@ -58,6 +287,22 @@ class ExtendedGitRepo(Repo):
             return remote_refs[branch]
 
 
+    def getTrackingRev(self, branch: str, remote: str = "origin") -> str:
+        """Get revision of local remote-tracking branch (no git call)
+
+        Args:
+            branch (str): Branch name
+            remote (str, optional): Remote name. Defaults to "origin".
+
+        Returns:
+            str: Revision sha or None if remote-tracking branch does not exist
+        """
+        try:
+            return SymbolicReference.dereference_recursive(self, f"refs/remotes/{remote}/{branch}")
+        except (ValueError, OSError):
+            return None
+
+
     def getFirstCommit(self,branch:str = None) -> str:
         """Get first revision for given branch
 
@@ -72,9 +317,14 @@ class ExtendedGitRepo(Repo):
             branch = self.active_branch.name
         
         if branch in self.branches:
-            firstCommitRev = self.branches[branch].repo.git.rev_list("--max-parents=0","HEAD")
-            if firstCommitRev:
-                firstCommitRev = firstCommitRev.split()[-1]
+            # The root commit does not change as long as the history only grows
+            cache = commitCache.get(self)
+            firstCommitRev = cache["rootCommit"]
+            if firstCommitRev is None:
+                firstCommitRev = self.branches[branch].repo.git.rev_list("--max-parents=0","HEAD")
+                if firstCommitRev:
+                    firstCommitRev = firstCommitRev.split()[-1]
+                    commitCache.update(self, cache["head"], rootCommit=firstCommitRev)
             if "api" in globals():
                 api.sendDebugMessage(f"First commit is '{firstCommitRev}' for branch {branch}.")
             return firstCommitRev
@@ -85,7 +335,10 @@ class ExtendedGitRepo(Repo):
 
 
     def checkLocalRevExists(self, revision: str) -> bool:
-        """Check if given revision exists in local commits
+        """Check if given revision exists as commit in local object database
+
+        Full SHAs are looked up in the object database (no history walk), other revisions
+        (abbreviated SHAs, refs) are resolved with 'git rev-parse'.
 
         Args:
             revision (str): Revision to check
@@ -93,8 +346,7 @@ class ExtendedGitRepo(Repo):
         Returns:
             bool: Check result
         """
-        # // if revision in self.git.rev_list('HEAD').split('\n'):
-        if revision in (c.hexsha for c in self.iter_commits()):
+        if revision and self._hasCommit(revision):
             if "api" in globals():
                 api.sendDebugMessage(f"Revision '{revision}' exists in local repository.")
             return True
@@ -104,7 +356,29 @@ class ExtendedGitRepo(Repo):
             return False
 
 
-    def setupCleanWorkCopy(self, revision: str = None, branch: str = None, backup: bool = False) -> str:
+    def _hasCommit(self, revision: str) -> bool:
+        if not isFullSha(revision):
+            try:
+                self.git.rev_parse("--verify", "--quiet", f"{revision}^{{commit}}")
+                return True
+            except GitCommandError:
+                return False
+
+        revision = revision.lower()
+        cache = commitCache.get(self)
+        if revision in cache["knownCommits"]:
+            return True
+        try:
+            # Header lookup by the persistent 'git cat-file' process
+            exists = self.odb.info(hex_to_bin(revision)).type == b"commit"
+        except ValueError:
+            exists = False
+        if exists:
+            commitCache.update(self, cache["head"], knownCommits=cache["knownCommits"] | {revision})
+        return exists
+
+
+    def setupCleanWorkCopy(self, revision: str = None, branch: str = None, backup: bool = False, backupOptions: dict = {}) -> str:
         """Setup clean local branch (Reset and clean local data)
             https://stackoverflow.com/questions/11864735/how-to-do-a-git-reset-hard-using-gitpython
 
@@ -115,9 +389,15 @@ class ExtendedGitRepo(Repo):
                 Branch to checkout. If None, active branch will be used. Defaults to None.
             backup (bool, optional):
                 Flag to make backup. Defaults to False.
+            backupOptions (dict, optional):
+                Options of backup archive (compressLevel, maxBytes, excludes), see CM.Backup.createBackup. Defaults to {}.
+                Nothing is cleaned if files exceed the size limit (maxBytes), excluded files are deleted by the cleanup.
 
         Returns:
             str: active revision number
+
+        Raises:
+            RuntimeError: Backup is incomplete (see CM.Backup.checkBackupComplete)
         """
         # get active branch name
         if branch is None:
@@ -136,27 +416,25 @@ class ExtendedGitRepo(Repo):
             # Zip folder (local work copy)
             path = Path(self.working_dir)
             backupFile = Path(path.parent, path.name + ".zip")
-            # Delete old zip file
-            backupFile.unlink(missing_ok=True)
 
             # Get list of changed files
             changedFiles = [item.a_path for item in self.index.diff(None)]
             stagedFiles = [item.a_path for item in self.index.diff(branch)]
-            # Loop over all changed files
-            for file in set(stagedFiles + changedFiles + self.untracked_files):
-                file = Path(path, file)
-                if file.exists():
-                    with ZipFile(backupFile, "a") as zip:
-                        # zipping the file
-                        zip.write(file, file.relative_to(path))
-                    api.sendDebugMessage(f"File '{file.relative_to(path)}' is added to zip file!")
-                else:
-                    api.sendDebugMessage(f"File '{file.relative_to(path)}' is missing or deleted!")
+            result = createBackup(path, set(stagedFiles + changedFiles + self.untracked_files), backupFile, **backupOptions)
+            if "api" in globals():
+                api.sendDebugMessage(f"{result['files']} files ({result['bytes']} bytes) are added to zip file!")
+                for file in result["missing"]:
+                    api.sendDebugMessage(f"File '{file}' is missing or deleted!")
+                for file in result["skipped"]:
+                    api.sendDebugMessage(f"File '{file}' is skipped, backup size limit is reached!")
+            # Working copy is not cleaned if the backup is incomplete
+            checkBackupComplete(result)
 
             # move to recycling bin
             if backupFile.exists():
                 send2trash(backupFile)
-                api.sendDebugMessage(f"Backup '{backupFile}' is sent to trash!")
+                if "api" in globals():
+                    api.sendDebugMessage(f"Backup '{backupFile}' is sent to trash!")
 
         # check if commit exist in local repo
         if not self.checkLocalRevExists(revision):
@@ -206,13 +484,20 @@ class ExtendedGitRepo(Repo):
         return self.active_branch.commit.hexsha
 
 
-    def generateChangelog(self, logFilePath: str, startCommit: str = None, items: list = []) -> None:
+    def generateChangelog(self, logFilePath: str, startCommit: str = None, items: list = [], incremental: bool = False,
+                          encoding: str = None) -> None:
         """Generate change log for given items 
 
+        The log is streamed from git to the file, which is written in text mode (platform line
+        endings). In incremental mode the last written commit is recorded next to the change log
+        ('<logFile>.state.json') and only newer commits are added on top of the existing change log.
+
         Args:
             logFilePath (str): Changelog file path
             startCommit (str, optional): Commit to start with changelog. Defaults to None.
             items (list, optional): List of files/folders for which a change log is to be created. Defaults to [].
+            incremental (bool, optional): Add only commits since last generation. Defaults to False.
+            encoding (str, optional): Encoding of the changelog file. Defaults to None (locale encoding).
         """
         # Create folder structure
         logFilePath = Path(logFilePath)
@@ -225,38 +510,194 @@ class ExtendedGitRepo(Repo):
         # Filter items, whether item is part of the repo
         items = [item for item in items if self.working_dir in item]
 
-        # Get changelog and write to file
-        changeLog = self.active_branch.repo.git.log("--no-merges", 
-                        "--format=%s%n========%nAuthor: %aN%nCommit: %H%nDate:   %aD%n%n%b%n", 
-                        f"{startCommit}..HEAD", items)
-        with open(logFilePath, "w") as logFile:
-            logFile.write(changeLog)
+        head = self.head.commit.hexsha
+        stateFilePath = logFilePath.with_name(logFilePath.name + ".state.json")
+        state = {"head": head, "startCommit": startCommit, "items": items}
+
+        lastHead = self._getChangelogHead(logFilePath, stateFilePath, state) if incremental else None
+        if lastHead == head:
+            if "api" in globals():
+                api.sendDebugMessage(f"Changelog '{logFilePath}' is up-to-date.")
+            return
+
+        # Get changelog and write to file (newest commits first)
+        tempFilePath = logFilePath.with_name(logFilePath.name + ".tmp")
+        with open(tempFilePath, "w", encoding=encoding) as logFile:
+            process = self.git.log("--no-merges", 
+                                   "--format=%s%n========%nAuthor: %aN%nCommit: %H%nDate:   %aD%n%n%b%n", 
+                                   f"{lastHead or startCommit}..{head}", "--", *items, as_process=True)
+            try:
+                # Like the complete log output of git, without its last line break
+                lineBreak = ""
+                for line in io.TextIOWrapper(process.stdout, encoding="utf-8", errors="replace", newline="\n"):
+                    logFile.write(lineBreak + line.removesuffix("\n"))
+                    lineBreak = "\n" if line.endswith("\n") else ""
+            except BaseException:
+                process.proc.kill()
+                process.proc.wait()
+                raise
+            # Raises GitCommandError if git failed
+            process.wait()
+            if lastHead is not None:
+                with open(logFilePath, "r", encoding=encoding) as oldLogFile:
+                    logFile.write(lineBreak)
+                    shutil.copyfileobj(oldLogFile, logFile)
+        os.replace(tempFilePath, logFilePath)
+
+        if incremental:
+            with open(stateFilePath, "w") as stateFile:
+                json.dump(state, stateFile)
+        else:
+            stateFilePath.unlink(missing_ok=True)
+        if "api" in globals():
+            api.sendDebugMessage(f"Changelog '{logFilePath}' is written up to commit '{head}'.")
+
+
+    def _getChangelogHead(self, logFilePath: Path, stateFilePath: Path, state: dict) -> str:
+        # Last written commit, None if the change log has to be generated completely
+        try:
+            with open(stateFilePath, "r") as stateFile:
+                lastState = json.load(stateFile)
+        except (OSError, ValueError):
+            return None
+        if not logFilePath.exists():
+            return None
+        if lastState.get("startCommit") != state["startCommit"] or lastState.get("items") != state["items"]:
+            return None
+        lastHead = lastState.get("head")
+        if not lastHead or not self.checkLocalRevExists(lastHead):
+            return None
+        try:
+            # History was rewritten since last generation
+            if not self.is_ancestor(lastHead, state["head"]):
+                return None
+        except GitCommandError:
+            return None
+        return lastHead
             
         
     def getCommitSha(self, item: str) -> str:
+        return self.getCommitShas([item])[item]
+
+
+    def _getRelativePath(self, item: str) -> str:
         # Get relative path of item
         item = Path(item)
         if item.is_relative_to(self.working_dir):
             item = item.relative_to(self.working_dir)
-        
-        # Get last commit hash of file
-        hash = [commit.hexsha for commit in self.active_branch.repo.iter_commits(max_count=1, paths=item.as_posix())]
-        if hash:
-            return hash[0]
-        else:
-            return '' 
+        return item.as_posix()
+
+
+    def getCommitShas(self, items: list) -> dict:
+        """Get last commit of several files/folders with one pass over the history
+
+        Results are cached as long as HEAD does not move. Merge commits are not considered. Like
+        'git log -- <item>', a change of a side branch which was discarded by a merge is not credited.
+
+        Args:
+            items (list): List of files/folders (absolute or relative to working directory)
+
+        Returns:
+            dict: Last commit sha per item ('' if the item was never committed)
+        """
+        cache = commitCache.get(self)
+        # (head, last commit per path) of the cached HEAD
+        lastCommitsHead, pathCommits = cache.get("lastCommits", (None, {}))
+        if lastCommitsHead != cache["head"]:
+            pathCommits = {}
+
+        paths = {item: self._getRelativePath(item) for item in items}
+        pending = {path for path in paths.values() if path not in pathCommits}
+        if pending and cache["head"] is not None:
+            pathCommits = {**pathCommits, **self._findLastCommits(pending)}
+            commitCache.update(self, cache["head"], lastCommits=(cache["head"], pathCommits))
+        return {item: pathCommits.get(path, "") for item, path in paths.items()}
+
+
+    def _findLastCommits(self, paths: set) -> dict:
+        # Walk history from HEAD (newest first) until every path is resolved. A commit is only
+        # credited if it left the path as it is in HEAD, changes of discarded side branches
+        # (e.g. 'git merge -s ours') are skipped like by the history simplification of git.
+        headObjects = self._getTreeIndex()
+        pending = set(paths)
+        lastCommits = {path: "" for path in paths}
+        if "." in pending:
+            lastCommits["."] = self.head.commit.hexsha
+            pending.discard(".")
+
+        # Paths are NUL terminated and not quoted, each commit starts with '\x01<sha>\0\n'
+        process = self.git.log("--no-merges", "--format=%x01%H", "--name-only", "-z", "HEAD", as_process=True)
+        try:
+            commit = None
+            firstPath = False
+            for field in readNulSeparated(process.stdout):
+                if not pending:
+                    break
+                if field.startswith("\x01"):
+                    commit = field[1:]
+                    firstPath = True
+                    continue
+                # File and all its parent folders are touched by this commit
+                path = field.removeprefix("\n") if firstPath else field
+                firstPath = False
+                while path:
+                    if path in pending and self._getObjectSha(commit, path) == headObjects.get(path):
+                        lastCommits[path] = commit
+                        pending.discard(path)
+                    path = path.rpartition("/")[0]
+        finally:
+            if process.proc.poll() is None:
+                process.proc.kill()
+            process.proc.wait()
+        return lastCommits
+
+
+    def _getObjectSha(self, commit: str, path: str) -> bytes:
+        # Binary sha of a blob or tree of given commit, None if the path is not part of the commit
+        try:
+            return (self.commit(commit).tree / path).binsha
+        except KeyError:
+            return None
 
 
     def getFileSha(self, item: str) -> str:
-        # Get relative path of item
-        item = Path(item)
-        if item.is_relative_to(self.working_dir):
-            item = item.relative_to(self.working_dir)
-        
-        # Get repo tree object    
-        tree = self.heads[self.active_branch.name].commit.tree
-        
-        return tree[item.as_posix()].hexsha
+        path = self._getRelativePath(item)
+        sha = self._getTreeIndex().get(path)
+        if sha is None:
+            raise KeyError(f"Blob or Tree named '{path}' not found")
+        return sha.hex()
+
+
+    def getFileShas(self, items: list) -> dict:
+        """Get object sha of several files/folders of HEAD
+
+        Args:
+            items (list): List of files/folders (absolute or relative to working directory)
+
+        Returns:
+            dict: Object sha per item ('' if the item is not part of HEAD)
+        """
+        treeIndex = self._getTreeIndex()
+        shas = {}
+        for item in items:
+            sha = treeIndex.get(self._getRelativePath(item))
+            shas[item] = sha.hex() if sha is not None else ""
+        return shas
+
+
+    def _getTreeIndex(self) -> dict:
+        # Flat index of all blobs and trees of HEAD (path -> binary sha), rebuilt when HEAD moves
+        cache = commitCache.get(self)
+        treeIndexHead, paths = cache.get("treeIndex", (None, None))
+        if paths is None or treeIndexHead != cache["head"]:
+            paths = {}
+            if cache["head"] is not None:
+                for entry in self.git.ls_tree("-r", "-t", "-z", cache["head"]).split("\0"):
+                    if entry:
+                        info, _, path = entry.partition("\t")
+                        paths[path] = hex_to_bin(info.split()[2])
+            commitCache.update(self, cache["head"], treeIndex=(cache["head"], paths))
+        return paths
     
     
     def openExplorer(self) -> None:
@@ -288,4 +729,130 @@ class ExtendedGitRepo(Repo):
         # https://stackoverflow.com/questions/69099079/how-to-get-github-latest-commit-url-using-cli-with-respect-to-current-branch
         os.chdir(self.working_dir)
         subprocess.run(['gh','browse', '$(git rev-parse HEAD)', '-n'])
-        
\ No newline at end of file
+        
+
+
+class GitRepoRegistry():
+    """Process wide cache of repository handles keyed by working tree path
+
+    Handles are reused as long as the '.git' entry of the working tree is the same (device, inode and
+    modification time of its config), lock files and ref or index writes do not invalidate a handle. Evicted handles are only dropped,
+    not closed, because other threads may still use them. Their persistent git processes are stopped
+    when the last reference is gone.
+    """
+    def __init__(self, maxSize: int = 64) -> None:
+        self._maxSize = maxSize
+        self._repos = OrderedDict()
+        self._lock = threading.Lock()
+
+
+    @staticmethod
+    def _key(repoPath: str) -> str:
+        return os.path.normcase(os.path.abspath(repoPath))
+
+
+    @staticmethod
+    def _signature(repoPath: str) -> tuple:
+        try:
+            stat = os.stat(os.path.join(repoPath, ".git"))
+        except OSError:
+            return None
+        try:
+            # A recreated '.git' folder may get the inode of the removed one, its config is always new
+            configTime = os.stat(os.path.join(repoPath, ".git", "config")).st_mtime_ns
+        except OSError:
+            configTime = None
+        return (stat.st_dev, stat.st_ino, configTime)
+
+
+    def get(self, repoPath: str) -> ExtendedGitRepo:
+        """Get cached repository handle for given path
+
+        Args:
+            repoPath (str): Path of local working copy
+
+        Returns:
+            ExtendedGitRepo: Repository handle
+        """
+        key = self._key(repoPath)
+        signature = self._signature(repoPath)
+        with self._lock:
+            if key in self._repos:
+                repo, cachedSignature = self._repos[key]
+                if signature is not None and signature == cachedSignature:
+                    self._repos.move_to_end(key)
+                    return repo
+                # '.git' is removed or recreated
+                del self._repos[key]
+
+        repo = ExtendedGitRepo(repoPath)
+        with self._lock:
+            if key in self._repos:
+                # Handle was created concurrently by another thread
+                repo.close()
+                repo = self._repos[key][0]
+                self._repos.move_to_end(key)
+            else:
+                self._repos[key] = (repo, signature)
+                while len(self._repos) > self._maxSize:
+                    self._repos.popitem(last=False)
+        return repo
+
+
+    def invalidate(self, repoPath: str) -> None:
+        """Remove cached handle for given path
+
+        Args:
+            repoPath (str): Path of local working copy
+        """
+        with self._lock:
+            self._repos.pop(self._key(repoPath), None)
+
+
+    def clear(self) -> None:
+        """Remove all cached handles"""
+        with self._lock:
+            self._repos.clear()
+
+
+repoRegistry = GitRepoRegistry()
+
+
+def generateChangelogs(jobs: list, maxWorkers: int = None) -> dict:
+    """Generate change logs of several repositories in parallel
+
+    Jobs of the same repository run one after another in one thread, repository handles
+    (and their git processes) are never used by two threads at the same time.
+
+    Args:
+        jobs (list): Dicts with keys 'repoPath', 'logFilePath' and optional 'startCommit', 'items', 'incremental' and 'encoding'
+        maxWorkers (int, optional): Maximum number of parallel generations. Defaults to None (ThreadPoolExecutor default).
+
+    Returns:
+        dict: Error messages per repository path, one line per failed job (empty string if successful)
+    """
+    # Paths of the same working tree share one handle of the registry
+    repoJobs = {}
+    for job in jobs:
+        repoJobs.setdefault(repoRegistry._key(job["repoPath"]), []).append(job)
+
+    def generate(key: str) -> list:
+        errors = []
+        for job in repoJobs[key]:
+            try:
+                repoRegistry.get(job["repoPath"]).generateChangelog(
+                    job["logFilePath"], job.get("startCommit"), job.get("items", []), job.get("incremental", False),
+                    job.get("encoding")
+                )
+                errors.append((job["repoPath"], ""))
+            except (GitCommandError, OSError, ValueError) as e:
+                errors.append((job["repoPath"], str(e)))
+        return errors
+
+    results = {job["repoPath"]: [] for job in jobs}
+    with ThreadPoolExecutor(maxWorkers) as executor:
+        for errors in executor.map(generate, repoJobs):
+            for repoPath, error in errors:
+                if error:
+                    results[repoPath].append(error)
+    return {repoPath: "\n".join(errors) for repoPath, errors in results.items()}
@@ -8,10 +8,11 @@ import os
 import sys
 import clr
 import subprocess
-from zipfile import ZipFile
 from pathlib import Path
 from send2trash import send2trash
 
+from CM.Backup import createBackup, checkBackupComplete
+
 # customer modules
 # Get config data
 from ConfigFileHandling import GetConfigData
@@ -37,15 +38,18 @@ Import Modules"""
 
 
 class ExtendedSvnRepo(Repository):
-    def _getStatus(self):
+    def _getStatus(self, retrieveAllEntries: bool = False):
         """Get status of local working copy
 
+        Args:
+            retrieveAllEntries (bool, optional): Report unchanged items too. Defaults to False (only changed items).
+
         Returns:
             object:
         """
         # Set client arguments
         statusArgs = SharpSvn.SvnStatusArgs()
-        statusArgs.RetrieveAllEntries = True
+        statusArgs.RetrieveAllEntries = retrieveAllEntries
         # // statusArgs.Depth = SharpSvn.SvnDepth.Infinity
         # // statusArgs.IgnoreWorkingCopyStatus = True
         # Get status
@@ -96,7 +100,9 @@ class ExtendedSvnRepo(Repository):
 
         # get status of local working copy
         status = self._getStatus()
+        return self._formatStatusItems(status[1], untracked_files)
 
+    def _formatStatusItems(self, statusItems, untracked_files: bool = True) -> list:
         # Check for dirty status (set is much faster than list)
         dirtyStatusList = {
             SharpSvn.SvnStatus.Modified,
@@ -109,7 +115,7 @@ class ExtendedSvnRepo(Repository):
             dirtyStatusList.add(SharpSvn.SvnStatus.NotVersioned)
         
         dirtyItems = []    
-        for item in [x for x in status[1] if x.LocalContentStatus in dirtyStatusList]:
+        for item in [x for x in statusItems if x.LocalContentStatus in dirtyStatusList]:
             relativePath = Path(item.Path).relative_to(self._localWorkingFolder).as_posix()
             if item.LocalContentStatus == SharpSvn.SvnStatus.Modified:
                 dirtyItems.append(f' M {relativePath}')
@@ -126,6 +132,36 @@ class ExtendedSvnRepo(Repository):
             
         return dirtyItems
 
+    def getStatusSnapshot(self, untracked_files: bool = True, remoteLastChangeRevision: int = None) -> dict:
+        """Get revisions of working copy and remote folder and changed items at once
+        (one remote call, one working copy walk)
+
+        Args:
+            untracked_files (bool, optional): Report untracked files. Defaults to True.
+            remoteLastChangeRevision (int, optional):
+                Known last change revision of remote folder, no remote call is made if given. Defaults to None.
+
+        Returns:
+            dict: Revisions as int ('localRevision', 'localLastChangeRevision', 'remoteRevision' (None if
+                  not requested), 'remoteLastChangeRevision'), changed items ('entries', see getStatus) and 'isDirty'
+        """
+        localInfo = self._svnClient.GetInfo(SharpSvn.SvnPathTarget(self._localWorkingFolder), None)[1]
+        remoteRevision = None
+        if remoteLastChangeRevision is None:
+            remoteInfo = self._svnClient.GetInfo(SharpSvn.SvnUriTarget(self._repositoryFolder), None)[1]
+            remoteRevision = int(remoteInfo.Revision)
+            remoteLastChangeRevision = int(remoteInfo.LastChangeRevision)
+        entries = self._formatStatusItems(self._getStatus()[1], untracked_files)
+
+        return {
+            "localRevision": int(localInfo.Revision),
+            "localLastChangeRevision": int(localInfo.LastChangeRevision),
+            "remoteRevision": remoteRevision,
+            "remoteLastChangeRevision": remoteLastChangeRevision,
+            "entries": entries,
+            "isDirty": bool(entries),
+        }
+
     def getWorkCopyInfo(self) -> dict:
         """Get info of local working copy
 
@@ -189,6 +225,59 @@ class ExtendedSvnRepo(Repository):
         return str(info[1].Revision)
 
 
+    def updateWithProgress(self, progress=None, stats: dict = None) -> str:
+        """Update working copy to head revision and report every received item
+
+        Args:
+            progress (callable, optional): Called with number of received items and path of last item. Defaults to None.
+            stats (dict, optional): Receives number of transferred 'bytes'. Defaults to None.
+
+        Returns:
+            str: active revision number
+        """
+        receivedActions = {
+            SharpSvn.SvnNotifyAction.UpdateAdd,
+            SharpSvn.SvnNotifyAction.UpdateDelete,
+            SharpSvn.SvnNotifyAction.UpdateReplace,
+            SharpSvn.SvnNotifyAction.UpdateUpdate,
+        }
+        receivedItems = 0
+
+        def onNotify(sender, e):
+            nonlocal receivedItems
+            if e.Action in receivedActions:
+                receivedItems += 1
+                progress(receivedItems, e.FullPath)
+
+        def onProgress(sender, e):
+            # Bytes transferred so far by the current connection
+            stats["bytes"] = max(stats["bytes"], e.Progress)
+
+        if stats is not None:
+            stats["bytes"] = 0
+            self._svnClient.Progress += onProgress
+        if progress is not None:
+            self._svnClient.Notify += onNotify
+        try:
+            return self.update()
+        finally:
+            if progress is not None:
+                self._svnClient.Notify -= onNotify
+            if stats is not None:
+                self._svnClient.Progress -= onProgress
+
+    def getRemoteYoungestRevision(self) -> int:
+        """Get youngest revision of remote repository (changes with every commit to any folder)
+
+        Returns:
+            int: revision number
+        """
+        target = SharpSvn.SvnUriTarget(self._repositoryUrl)
+        info = self._svnClient.GetInfo(target, None)
+
+        return int(info[1].Revision)
+
+
     def getRemoteLastChangeRevision(self) -> str:
         """Get revision from remote repository folder
 
@@ -203,7 +292,7 @@ class ExtendedSvnRepo(Repository):
         return str(info[1].LastChangeRevision)
     
 
-    def setupCleanWorkCopy(self, revision: str = None, branch: str = None, backup: bool = False) -> str:
+    def setupCleanWorkCopy(self, revision: str = None, branch: str = None, backup: bool = False, backupOptions: dict = {}) -> str:
         """Setup clean local working copy (Reset and clean local data)
 
         Args:
@@ -213,9 +302,15 @@ class ExtendedSvnRepo(Repository):
                 Branch to checkout. If None, active branch will be used. Defaults to None.
             backup (bool, optional):
                 Flag to make backup. Defaults to False.
+            backupOptions (dict, optional):
+                Options of backup archive (compressLevel, maxBytes, excludes), see CM.Backup.createBackup. Defaults to {}.
+                Nothing is cleaned if files exceed the size limit (maxBytes), excluded files are deleted by the cleanup.
 
         Returns:
             str: active revision number
+
+        Raises:
+            RuntimeError: Backup is incomplete (see CM.Backup.checkBackupComplete)
         """
 
         # Get info of current work copy
@@ -236,8 +331,6 @@ class ExtendedSvnRepo(Repository):
             # Zip folder (local work copy)
             path = Path(self._localWorkingFolder)
             backupFile = Path(path.parent, path.name + ".zip")
-            # Delete old zip file
-            backupFile.unlink(missing_ok=True)
 
             # Get work copy status
             repoStatus = self._getStatus()
@@ -249,16 +342,15 @@ class ExtendedSvnRepo(Repository):
                 SharpSvn.SvnStatus.Conflicted,
                 SharpSvn.SvnStatus.NotVersioned,
             }
-
-            for item in (x for x in repoStatus[1] if x.LocalContentStatus in dirtyStatusList):
-                file = Path(item.FullPath)
-                if file.exists():
-                    with ZipFile(backupFile, "a") as zip:
-                        # zipping the file
-                        zip.write(file, file.relative_to(path))
-                    api.sendDebugMessage(f"File '{file.relative_to(path)}' is added to zip file!")
-                else:
-                    api.sendDebugMessage(f"File '{file.relative_to(path)}' is missing or deleted!")
+            changedFiles = [x.FullPath for x in repoStatus[1] if x.LocalContentStatus in dirtyStatusList]
+            result = createBackup(path, changedFiles, backupFile, **backupOptions)
+            api.sendDebugMessage(f"{result['files']} files ({result['bytes']} bytes) are added to zip file!")
+            for file in result["missing"]:
+                api.sendDebugMessage(f"File '{file}' is missing or deleted!")
+            for file in result["skipped"]:
+                api.sendDebugMessage(f"File '{file}' is skipped, backup size limit is reached!")
+            # Working copy is not cleaned if the backup is incomplete
+            checkBackupComplete(result)
 
             # move to recycling bin
             if backupFile.exists():
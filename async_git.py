@@ -0,0 +1,121 @@
+import asyncio
+import os
+import re
+import subprocess
+
+from git import GitCommandError
+
+from CM.Git import parseStatusPorcelainV2, parseRemoteHeads
+
+
+# Maximum number of concurrently running git processes (same default as ThreadPoolExecutor)
+GIT_CONCURRENCY = min(32, (os.cpu_count() or 1) + 4)
+
+# Never wait for credentials on a terminal nobody is looking at
+GIT_ENV = {**os.environ, 'GIT_TERMINAL_PROMPT': '0'}
+
+# Final progress line of a transfer, e.g. 'Receiving objects: 100% (12/12), 3.20 KiB | 1.60 MiB/s, done.'
+TRANSFER_PROGRESS = re.compile(r'(?:Receiving|Unpacking|Writing) objects: 100% \(\d+/\d+\), ([\d.]+) (bytes|KiB|MiB|GiB)')
+PROGRESS_LINE = re.compile(r'^(?:remote: )?(?:[A-Z][a-z]+ (?:objects|deltas):|Total \d+ )')
+UNIT_BYTES = {'bytes': 1, 'KiB': 1024, 'MiB': 1024 ** 2, 'GiB': 1024 ** 3}
+
+_semaphore = None
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    # Created lazily, the semaphore must belong to the running event loop
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(GIT_CONCURRENCY)
+    return _semaphore
+
+
+def transferred_bytes(output: str) -> int:
+    """Sum of bytes of all transfers reported in progress output of fetch, push or clone
+
+    Small fetches unpacked to loose objects do not report their size and count as 0 bytes.
+    """
+    return int(sum(float(size) * UNIT_BYTES[unit] for size, unit in TRANSFER_PROGRESS.findall(output)))
+
+
+def strip_progress(output: str) -> str:
+    # Progress lines are overwritten with carriage returns, only the last state of a line is kept
+    lines = [line.rpartition('\r')[2] for line in output.split('\n')]
+    return '\n'.join(line for line in lines if not PROGRESS_LINE.match(line))
+
+
+async def _execute(repoPath: str, args: tuple, timeout: float = None) -> tuple:
+    command = ['git', *args]
+    async with _get_semaphore():
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            cwd=repoPath,
+            env=GIT_ENV,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            creationflags=subprocess.CREATE_NO_WINDOW if os.name == 'nt' else 0)
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+        finally:
+            # Time out or cancelled
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+
+    stdout = stdout.decode('utf-8', errors='replace').removesuffix('\n')
+    stderr = stderr.decode('utf-8', errors='replace').removesuffix('\n')
+    if process.returncode != 0:
+        if '--progress' in args:
+            stderr = strip_progress(stderr)
+        raise GitCommandError(command, process.returncode, stderr, stdout)
+    return stdout, stderr
+
+
+async def run_git(repoPath: str, *args: str, timeout: float = None) -> str:
+    """Run git command as asyncio subprocess and return its stdout
+
+    :param repoPath: Working directory of the git process (None for current directory).
+    :param args: Git command and arguments.
+    :param timeout: Time in seconds after which the process is killed and asyncio.TimeoutError is raised.
+    :raises GitCommandError: If git returns with a non-zero exit code.
+    """
+    stdout, _ = await _execute(repoPath, args, timeout)
+    return stdout
+
+
+async def _run_git_transfer(repoPath: str, command: str, *args: str, timeout: float = None, stats: dict = None) -> str:
+    # Git reports the transferred size only with progress output
+    stdout, stderr = await _execute(repoPath, (command, '--progress', *args), timeout)
+    if stats is not None:
+        stats['bytes'] = transferred_bytes(stderr)
+    return stdout or strip_progress(stderr)
+
+
+async def fetch(repoPath: str, timeout: float = None, stats: dict = None) -> str:
+    """Fetch from remote, the transferred bytes are stored in stats['bytes'] (optional)"""
+    return await _run_git_transfer(repoPath, 'fetch', timeout=timeout, stats=stats)
+
+
+async def pull(repoPath: str, timeout: float = None, stats: dict = None) -> str:
+    """Pull from remote, the transferred bytes are stored in stats['bytes'] (optional)"""
+    return await _run_git_transfer(repoPath, 'pull', timeout=timeout, stats=stats)
+
+
+async def push(repoPath: str, timeout: float = None, stats: dict = None) -> str:
+    return await _run_git_transfer(repoPath, 'push', timeout=timeout, stats=stats)
+
+
+async def clone(gitUrl: str, repoPath: str, branchName: str = 'main', timeout: float = None, stats: dict = None) -> str:
+    return await _run_git_transfer(None, 'clone', '--branch', branchName, gitUrl, repoPath, timeout=timeout, stats=stats)
+
+
+async def status(repoPath: str, timeout: float = None) -> dict:
+    """Get parsed status of working copy (see CM.Git.parseStatusPorcelainV2)"""
+    output = await run_git(repoPath, '--no-optional-locks', 'status', '--porcelain=v2', '--branch', '-z', timeout=timeout)
+    return parseStatusPorcelainV2(output)
+
+
+async def ls_remote_heads(repoPath: str, gitUrl: str, timeout: float = None) -> dict:
+    """Get revision of all remote heads (see CM.Git.parseRemoteHeads)"""
+    return parseRemoteHeads(await run_git(repoPath, 'ls-remote', '--heads', gitUrl, timeout=timeout))
@@ -0,0 +1,303 @@
+"""
+Benchmark of the repository tables
+
+Generates working copies cloned from local bare git repositories (and svn working copies
+checked out from a local file:// repository) and times the table operations end to end:
+init_data, update_table, _pull_repos, _push_repos and _clone_repo (git) and
+init_data, update_table and _update_repos (svn). Times include the notification delays of the UI.
+
+Example:
+    py -3.9 benchmark.py --repos 10 100 --runs 5
+
+--------------------------------------------------------------------------------
+Import Modules """
+from nicegui import ui, app
+from nicegui.client import Client
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import argparse
+import math
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+
+from git_repo_table import git_repo_table
+from log_viewer import log_viewer, logFile
+from status_snapshot import status_snapshot
+
+try:
+    from svn_repo_table import svn_repo_table
+except ImportError:
+    # SharpSvn is only available on Windows
+    svn_repo_table = None
+
+
+SETUP_WORKERS = min(32, (os.cpu_count() or 1) * 2)
+GIT_IDENTITY = ['-c', 'user.name=benchmark', '-c', 'user.email=benchmark@localhost']
+
+
+def run_command(*args: str, cwd: str = None) -> str:
+    return subprocess.run(args, cwd=cwd, check=True, capture_output=True, text=True).stdout
+
+
+def percentile(values: list, p: float) -> float:
+    # Nearest rank
+    values = sorted(values)
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+
+class phase_timer():
+    def __init__(self) -> None:
+        """Collect durations per phase and print latency percentiles"""
+        self.durations = {}
+
+    def add(self, phase: str, duration: float) -> None:
+        self.durations.setdefault(phase, []).append(duration)
+
+    def report(self, title: str) -> None:
+        print(f"\n{title}")
+        print(f"{'phase':<24}{'n':>5}{'min':>9}{'p50':>9}{'p90':>9}{'p99':>9}{'max':>9}   [s]")
+        for phase, durations in self.durations.items():
+            print(f"{phase:<24}{len(durations):>5}{min(durations):>9.3f}{percentile(durations, 50):>9.3f}"
+                  f"{percentile(durations, 90):>9.3f}{percentile(durations, 99):>9.3f}{max(durations):>9.3f}")
+
+
+class git_scenario():
+    def __init__(self, root: Path, repos: int, history: int, files: int, dirty: int, behind: int, ahead: int) -> None:
+        """Local bare repositories with one working copy each
+
+        :param root: Directory of the generated repositories.
+        :param repos: Number of working copies.
+        :param history: Number of commits of each repository.
+        :param files: Number of tracked files.
+        :param dirty: Number of modified files in each working copy.
+        :param behind: Number of commits each working copy is behind its upstream.
+        :param ahead: Number of local commits of each working copy.
+        """
+        self.root = root
+        self.repos = repos
+        self.history = history
+        self.files = files
+        self.dirty = min(dirty, files)
+        self.behind = min(behind, history - 1)
+        self.ahead = ahead
+        self.run = 0
+
+    def upstream(self, i: int) -> str:
+        return self.root.joinpath(f'upstream_{i}.git').as_posix()
+
+    def working_copy(self, i: int) -> str:
+        return self.root.joinpath(f'wc_{i}').as_posix()
+
+    def table_data(self) -> dict:
+        return {
+            'AutoUpdate': False,
+            'AutoWatch': False,
+            'repo': [{'Path': self.working_copy(i), 'Url': self.upstream(i), 'Branch': 'main'} for i in range(self.repos)]
+        }
+
+    def create(self) -> None:
+        seed = self.root.joinpath('seed').as_posix()
+        run_command('git', 'init', '-q', '-b', 'main', seed)
+        for k in range(self.files):
+            Path(seed, f'file_{k}.txt').write_text(f'file {k}\n')
+        for c in range(self.history):
+            with open(Path(seed, 'history.txt'), 'a') as f:
+                f.write(f'commit {c}\n')
+            run_command('git', *GIT_IDENTITY, 'add', '-A', cwd=seed)
+            run_command('git', *GIT_IDENTITY, 'commit', '-q', '-m', f'commit {c}', cwd=seed)
+
+        def create_repo(i: int) -> None:
+            run_command('git', 'clone', '-q', '--bare', seed, self.upstream(i))
+            run_command('git', 'clone', '-q', '-c', 'user.name=benchmark', '-c', 'user.email=benchmark@localhost',
+                        '-c', 'pull.rebase=false', self.upstream(i), self.working_copy(i))
+        with ThreadPoolExecutor(SETUP_WORKERS) as executor:
+            list(executor.map(create_repo, range(self.repos)))
+
+    def diverge(self) -> None:
+        """Move each working copy behind its upstream, add local commits and modify files"""
+        self.run += 1
+
+        def diverge_repo(i: int) -> None:
+            wc = self.working_copy(i)
+            run_command('git', 'fetch', '-q', cwd=wc)
+            run_command('git', 'reset', '-q', '--hard', f'origin/main~{self.behind}', cwd=wc)
+            for j in range(self.ahead):
+                Path(wc, f'ahead_{self.run}_{j}.txt').write_text(f'run {self.run} commit {j}\n')
+                run_command('git', 'add', '-A', cwd=wc)
+                run_command('git', 'commit', '-q', '-m', f'run {self.run} commit {j}', cwd=wc)
+            for k in range(self.dirty):
+                with open(Path(wc, f'file_{k}.txt'), 'a') as f:
+                    f.write(f'dirty {self.run}\n')
+        with ThreadPoolExecutor(SETUP_WORKERS) as executor:
+            list(executor.map(diverge_repo, range(self.repos)))
+
+
+class svn_scenario():
+    def __init__(self, root: Path, repos: int, history: int, files: int, dirty: int, behind: int) -> None:
+        """Local file:// svn repository with several working copies of trunk
+
+        :param root: Directory of the generated repository and working copies.
+        :param repos: Number of working copies.
+        :param history: Number of commits of the repository.
+        :param files: Number of versioned files.
+        :param dirty: Number of modified files in each working copy.
+        :param behind: Number of revisions each working copy is behind HEAD.
+        """
+        self.root = root
+        self.repos = repos
+        self.history = history
+        self.files = files
+        self.dirty = min(dirty, files)
+        self.behind = min(behind, history - 1)
+        self.serverUrl = self.root.joinpath('svn_server').as_uri()
+
+    def working_copy(self, i: int) -> str:
+        return self.root.joinpath(f'svn_wc_{i}').as_posix()
+
+    def table_data(self) -> dict:
+        return {
+            'AutoUpdate': False,
+            'AutoWatch': False,
+            'repo': [{'Path': self.working_copy(i), 'ServerUrl': self.serverUrl, 'RepoDir': 'trunk'} for i in range(self.repos)]
+        }
+
+    def create(self) -> None:
+        run_command('svnadmin', 'create', self.root.joinpath('svn_server').as_posix())
+        seed = self.root.joinpath('svn_seed')
+        seed.mkdir()
+        for k in range(self.files):
+            seed.joinpath(f'file_{k}.txt').write_text(f'file {k}\n')
+        run_command('svn', 'import', '-q', '-m', 'import', seed.as_posix(), f'{self.serverUrl}/trunk')
+        shutil.rmtree(seed)
+        run_command('svn', 'checkout', '-q', f'{self.serverUrl}/trunk', seed.as_posix())
+        for c in range(self.history):
+            with open(seed.joinpath('history.txt'), 'a') as f:
+                f.write(f'commit {c}\n')
+            if c == 0:
+                run_command('svn', 'add', '-q', 'history.txt', cwd=seed.as_posix())
+            run_command('svn', 'commit', '-q', '-m', f'commit {c}', cwd=seed.as_posix())
+
+        with ThreadPoolExecutor(SETUP_WORKERS) as executor:
+            list(executor.map(lambda i: run_command('svn', 'checkout', '-q', f'{self.serverUrl}/trunk', self.working_copy(i)),
+                              range(self.repos)))
+
+    def diverge(self) -> None:
+        """Move each working copy behind HEAD and modify files"""
+        def diverge_repo(i: int) -> None:
+            wc = self.working_copy(i)
+            run_command('svn', 'revert', '-q', '-R', '.', cwd=wc)
+            run_command('svn', 'update', '-q', '-r', f'{self.history + 1 - self.behind}', cwd=wc)
+            for k in range(self.dirty):
+                with open(Path(wc, f'file_{k}.txt'), 'a') as f:
+                    f.write('dirty\n')
+        with ThreadPoolExecutor(SETUP_WORKERS) as executor:
+            list(executor.map(diverge_repo, range(self.repos)))
+
+
+async def timed(timer: phase_timer, phase: str, operation) -> None:
+    start = time.perf_counter()
+    await operation
+    timer.add(phase, time.perf_counter() - start)
+
+
+async def benchmark_git(table: git_repo_table, scenario: git_scenario, runs: int, clones: int) -> phase_timer:
+    timer = phase_timer()
+    tableData = scenario.table_data()
+    for _ in range(runs):
+        scenario.diverge()
+
+        # Initialization until the status of all repositories is available
+        table.engine.clear()
+        start = time.perf_counter()
+        table.init_data(tableData)
+        await table.engine.sweep()
+        timer.add('init_data', time.perf_counter() - start)
+
+        await timed(timer, 'update_table', table.update_table(table.table.rows))
+        await timed(timer, '_pull_repos', table._pull_repos(table.table.rows))
+        await timed(timer, '_push_repos', table._push_repos(table.table.rows))
+
+    for i in range(min(clones, scenario.repos)):
+        repo = {'Path': scenario.root.joinpath(f'clone_{i}').as_posix(), 'Url': scenario.upstream(i), 'Branch': 'main'}
+        await timed(timer, '_clone_repo', table._clone_repo(repo))
+    return timer
+
+
+async def benchmark_svn(table, scenario: svn_scenario, runs: int) -> phase_timer:
+    timer = phase_timer()
+    tableData = scenario.table_data()
+    for _ in range(runs):
+        scenario.diverge()
+
+        table.engine.clear()
+        start = time.perf_counter()
+        table.init_data(tableData)
+        await table.engine.sweep()
+        timer.add('init_data', time.perf_counter() - start)
+
+        await timed(timer, 'update_table', table.update_table(table.table.rows))
+        await timed(timer, '_update_repos', table._update_repos(table.table.rows))
+    return timer
+
+
+async def run_benchmark(args: argparse.Namespace) -> None:
+    try:
+        for repos in args.repos:
+            root = Path(tempfile.mkdtemp(prefix=f'repo_benchmark_{repos}_', dir=args.root))
+            print(f"Create {repos} repositories in {root} ...")
+
+            with Client.auto_index_client:
+                # Keep the log file of the application untouched
+                logFile.configure({'File': False})
+                log = log_viewer(max_lines=100)
+                gitTable = git_repo_table()
+                gitTable.add_logger(log)
+                # Keep the status snapshot of the application untouched
+                gitTable.engine.snapshot = status_snapshot('git', root)
+
+                scenario = git_scenario(root, repos, args.history, args.files, args.dirty, args.behind, args.ahead)
+                scenario.create()
+                timer = await benchmark_git(gitTable, scenario, args.runs, args.clones)
+                timer.report(f"Git: {repos} repositories, {args.runs} runs")
+                gitTable.engine.clear()
+
+                if args.svn:
+                    if svn_repo_table is None or shutil.which('svnadmin') is None:
+                        print("Svn benchmark skipped, SharpSvn or svn command line tools are not available.")
+                    else:
+                        svnTable = svn_repo_table()
+                        svnTable.add_logger(log)
+                        svnTable.engine.snapshot = status_snapshot('svn', root)
+                        scenario = svn_scenario(root, repos, args.history, args.files, args.dirty, args.behind)
+                        scenario.create()
+                        timer = await benchmark_svn(svnTable, scenario, args.runs)
+                        timer.report(f"Svn: {repos} repositories, {args.runs} runs")
+                        svnTable.engine.clear()
+
+            if not args.keep:
+                shutil.rmtree(root, ignore_errors=True)
+    finally:
+        app.shutdown()
+
+
+if __name__ in {'__main__', '__mp_main__'}:
+    parser = argparse.ArgumentParser(description="Benchmark of the repository tables")
+    parser.add_argument("--repos", type=int, nargs='+', default=[10, 100, 1000], help="Numbers of working copies.")
+    parser.add_argument("--history", type=int, default=20, help="Number of commits of each repository.")
+    parser.add_argument("--files", type=int, default=20, help="Number of tracked files.")
+    parser.add_argument("--dirty", type=int, default=2, help="Number of modified files in each working copy.")
+    parser.add_argument("--behind", type=int, default=2, help="Commits each working copy is behind its upstream.")
+    parser.add_argument("--ahead", type=int, default=1, help="Local commits of each git working copy.")
+    parser.add_argument("--runs", type=int, default=3, help="Repetitions of each phase.")
+    parser.add_argument("--clones", type=int, default=10, help="Number of timed clones.")
+    parser.add_argument("--svn", action='store_true', help="Benchmark svn table too.")
+    parser.add_argument("--root", type=str, default=None, help="Directory of the generated repositories.")
+    parser.add_argument("--keep", action='store_true', help="Keep generated repositories.")
+    parser.add_argument("--port", type=int, default=8099, help="Port of the (unused) web server.")
+    args = parser.parse_args()
+
+    app.on_startup(run_benchmark(args))
+    ui.run(reload=False, show=False, port=args.port)
@@ -0,0 +1,137 @@
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import translate
+from pathlib import Path
+import os
+import re
+import sqlite3
+
+from git.config import GitConfigParser
+
+
+# Admin folders which mark the root of a working copy, folders below are not scanned
+ADMIN_FOLDERS = {'.git': 'git', '.svn': 'svn'}
+
+
+def exclude_matcher(excludes: list):
+    """Function which tells if a folder matches one of the glob patterns (matched against path and name)"""
+    if not excludes:
+        return lambda folder: False
+    # One regular expression for all patterns, case insensitive like paths on Windows
+    pattern = re.compile('|'.join(translate(exclude) for exclude in excludes), re.IGNORECASE if os.name == 'nt' else 0)
+
+    def is_excluded(folder: str) -> bool:
+        folder = folder.replace('\\', '/')
+        return pattern.match(folder) is not None or pattern.match(folder.rpartition('/')[2]) is not None
+    return is_excluded
+
+
+def git_repo_entry(repoPath: str) -> dict:
+    """Repository entry (Path, Url, Branch) of a git working copy, read from its git folder
+
+    Raises ValueError for a detached HEAD, the branch of the entry is unknown.
+    """
+    gitDir = Path(repoPath, '.git')
+    if gitDir.is_file():
+        # Worktree or submodule: '.git' file points to the git folder
+        gitDir = Path(repoPath, gitDir.read_text(encoding='utf-8').strip().removeprefix('gitdir: ')).resolve()
+    commonDir = gitDir
+    if gitDir.joinpath('commondir').is_file():
+        commonDir = gitDir.joinpath(gitDir.joinpath('commondir').read_text(encoding='utf-8').strip()).resolve()
+    url = GitConfigParser(str(commonDir.joinpath('config')), read_only=True).get_value('remote "origin"', 'url', '')
+    head = gitDir.joinpath('HEAD').read_text(encoding='utf-8').strip()
+    if not head.startswith('ref: refs/heads/'):
+        raise ValueError(f"Detached HEAD at {head[:12]}, branch unknown")
+    return {'Path': Path(repoPath).as_posix(), 'Url': url, 'Branch': head.removeprefix('ref: refs/heads/')}
+
+
+def svn_repo_entry(repoPath: str) -> dict:
+    """Repository entry (Path, ServerUrl, RepoDir) of a svn working copy, read from its wc.db"""
+    database = Path(repoPath, '.svn', 'wc.db')
+    connection = sqlite3.connect(f'{database.as_uri()}?mode=ro', uri=True)
+    try:
+        serverUrl, repoDir = connection.execute(
+            "SELECT REPOSITORY.root, NODES.repos_path FROM NODES JOIN REPOSITORY ON REPOSITORY.id = NODES.repos_id "
+            "WHERE NODES.local_relpath = '' AND NODES.op_depth = 0").fetchone()
+    finally:
+        connection.close()
+    return {'Path': Path(repoPath).as_posix(), 'ServerUrl': serverUrl, 'RepoDir': repoDir}
+
+
+REPO_ENTRIES = {'git': git_repo_entry, 'svn': svn_repo_entry}
+
+
+class repo_discovery():
+    def __init__(self) -> None:
+        """Find git and svn working copies below root directories
+
+        The content of each scanned folder is cached with its modification time. A rescan only reads
+        folders whose entries changed since the last scan, all other folders cost one stat call.
+        """
+        self._cache = {}
+
+    def scan(self, roots: list, excludes: list = []) -> dict:
+        """Scan root directories in parallel, working copies are not scanned further
+
+        :param roots: Root directories.
+        :param excludes: Glob patterns of folders which are not scanned (matched against path and name).
+        :return: Sorted paths of working copies keyed by kind ('git', 'svn').
+        """
+        found = {kind: [] for kind in ADMIN_FOLDERS.values()}
+        with ThreadPoolExecutor(max_workers=max(1, len(roots))) as executor:
+            for rootFound in executor.map(lambda root: self.__scan_root(root, excludes), roots):
+                for kind, paths in rootFound.items():
+                    found[kind].extend(paths)
+        return {kind: sorted(set(paths)) for kind, paths in found.items()}
+
+    def discover(self, kind: str, roots: list, excludes: list = []) -> tuple:
+        """Repository entries of all working copies of given kind ('git' or 'svn') below the root directories
+
+        :return: Repository entries and messages of the working copies which were skipped.
+        """
+        repos = []
+        skipped = []
+        for repoPath in self.scan(roots, excludes)[kind]:
+            try:
+                repos.append(REPO_ENTRIES[kind](repoPath))
+            except (OSError, ValueError, TypeError, sqlite3.Error) as e:
+                skipped.append(f"Discovered {kind} repository {repoPath} skipped: {e}")
+        return repos, skipped
+
+    def __scan_root(self, root: str, excludes: list) -> dict:
+        found = {kind: [] for kind in ADMIN_FOLDERS.values()}
+        is_excluded = exclude_matcher(excludes)
+        folders = [os.path.normpath(root)]
+        while folders:
+            folder = folders.pop()
+            try:
+                mtime = os.stat(folder).st_mtime_ns
+            except OSError:
+                continue
+            cached = self._cache.get(folder)
+            if cached is None or cached[0] != mtime:
+                cached = (mtime, *self.__read_folder(folder))
+                self._cache[folder] = cached
+            _, kinds, subFolders = cached
+            for kind in kinds:
+                found[kind].append(Path(folder).as_posix())
+            folders.extend(subFolder for subFolder in subFolders if not is_excluded(subFolder))
+        return found
+
+    @staticmethod
+    def __read_folder(folder: str) -> tuple:
+        kinds = []
+        subFolders = []
+        try:
+            with os.scandir(folder) as entries:
+                for entry in entries:
+                    if entry.name in ADMIN_FOLDERS:
+                        kinds.append(ADMIN_FOLDERS[entry.name])
+                    elif entry.is_dir(follow_symlinks=False):
+                        subFolders.append(entry.path)
+        except OSError:
+            pass
+        # Working copies are not scanned further
+        return kinds, ([] if kinds else subFolders)
+
+
+repoDiscovery = repo_discovery()
@@ -1,27 +1,41 @@
-from nicegui import ui, run, background_tasks
+from nicegui import ui, background_tasks
 from pathlib import Path
 import asyncio
 
-from concurrent.futures import ThreadPoolExecutor
-from concurrent.futures import TimeoutError
-
-from CM.Git import ExtendedGitRepo as GitRepo
-from git import GitCommandError 
+from CM.Git import repoRegistry, remoteHeadsCache
+from git import GitCommandError, GitError
 
+import async_git
+from governor import resourceGovernor
+from metrics import operationMetrics
 from system_helpers import copy2clipboard
 from log_viewer import log_viewer
+from row_index import row_index
+from status_engine import status_engine
+
+
+# Maximum age in seconds of cached remote heads ('git ls-remote') used to skip fetching
+REMOTE_HEADS_MAX_AGE = 60.0
 
 
-def fetch_repo(repoPath: str) -> None:
-    GitRepo(repoPath).git.fetch()
+async def fetch_repo(r: dict) -> None:
+    """Fetch from remote, raises GitCommandError, asyncio.TimeoutError or OSError if the fetch failed"""
+    async with resourceGovernor.network(r['Url']), operationMetrics.measure('fetch', r['Path'], r['Url']) as sample:
+        await async_git.fetch(r['Path'], timeout=20, stats=sample)
 
-def pull_repo(repoPath: str) -> list:
+async def pull_repo(r: dict) -> dict:
+    # 'git pull' applies all pull, merge and rebase settings of the repository, it needs remote and working tree
+    repoPath = r['Path']
     try:
+        async with resourceGovernor.network(r['Url']), resourceGovernor.disk(repoPath), \
+                operationMetrics.measure('pull', repoPath, r['Url']) as sample:
+            message = await async_git.pull(repoPath, timeout=20, stats=sample)
         return {
             'Path': repoPath, 
             'Error': False, 
-            'Message': GitRepo(repoPath).git.pull()}
+            'Message': message}
     except GitCommandError as e:
+        result = str(e)
         if e.stderr:
             result = e.stderr.removeprefix("\n  stderr: 'error: ")
             result = result.removesuffix("\nAborting'")
@@ -29,98 +43,169 @@ def pull_repo(repoPath: str) -> list:
             'Path': repoPath, 
             'Error': True, 
             'Message': result}
+    except asyncio.TimeoutError:
+        return {
+            'Path': repoPath, 
+            'Error': True, 
+            'Message': 'Time out waiting to pull git repository.'}
+    except OSError as e:
+        # Working copy folder was removed or git is not available
+        return {
+            'Path': repoPath, 
+            'Error': True, 
+            'Message': str(e)}
     
-def push_repo(repoPath: str) -> str:
+async def push_repo(r: dict) -> dict:
+    repoPath = r['Path']
     try:
+        async with resourceGovernor.network(r['Url']), operationMetrics.measure('push', repoPath, r['Url']) as sample:
+            message = await async_git.push(repoPath, timeout=10, stats=sample)
         return {
             'Path': repoPath, 
             'Error': False, 
-            'Message': GitRepo(repoPath).git.push()}
+            'Message': message}
     except GitCommandError as e:
+        result = str(e)
         if e.stderr:
             result = e.stderr.removeprefix("\n  stderr: 'error: ")
-            result = result.removesuffix("\n'")
+            result = result.removesuffix("'")
         return {
             'Path': repoPath, 
             'Error': True, 
             'Message': result}
+    except asyncio.TimeoutError:
+        return {
+            'Path': repoPath, 
+            'Error': True, 
+            'Message': 'Time out waiting to push git repository.'}
+    except OSError as e:
+        # Working copy folder was removed or git is not available
+        return {
+            'Path': repoPath, 
+            'Error': True, 
+            'Message': str(e)}
     
-def clone_repo(repoPath: str, gitUrl: str, branchName: str = 'main') -> str:
+async def clone_repo(repoPath: str, gitUrl: str, branchName: str = 'main') -> str:
+    repoRegistry.invalidate(repoPath)
     try:
-        GitRepo.clone_from(gitUrl, repoPath, branch=branchName)
+        async with resourceGovernor.network(gitUrl), resourceGovernor.disk(repoPath), \
+                operationMetrics.measure('clone', repoPath, gitUrl) as sample:
+            await async_git.clone(gitUrl, repoPath, branchName, stats=sample)
         result = ''
     except GitCommandError as e:
+        result = str(e)
         if e.stderr:
             result = e.stderr.removeprefix("\n  stderr: 'fatal: ")
-            result = result.removesuffix("\n'")
+            result = result.removesuffix("'")
+    except OSError as e:
+        result = str(e)
     
     return result
 
-def fetch_repos_parallel(repoPaths: list) -> None:
-    with ThreadPoolExecutor() as executor:
-        try:
-            executor.map(fetch_repo, repoPaths, timeout=20)
-        except TimeoutError:
-            print('Time out waiting to fetch git repositories.') 
-    
-def pull_repos_parallel(repoPaths: list) -> list:
-    results = []
-    with ThreadPoolExecutor() as executor:
-        try:
-            for result in executor.map(pull_repo, repoPaths, timeout=10):
-                results.append(result)
-        except TimeoutError:
-            print('Time out waiting to pull git repositories.') 
-                
-    return results
-
-def push_repos_parallel(repoPaths: list) -> list:
-    results = []
-    with ThreadPoolExecutor() as executor:  
+
+async def fetch_required(r: dict) -> bool:
+    if not Path(r['Path']).joinpath('.git').is_dir():
+        return False
+    try:
+        repo = repoRegistry.get(r['Path'])
+        url = repo.getRemoteUrl()
+        remoteHeads = remoteHeadsCache.get(url, REMOTE_HEADS_MAX_AGE)
+        if remoteHeads is None:
+            async with resourceGovernor.network(url), operationMetrics.measure('ls-remote', r['Path'], url):
+                remoteHeads = await async_git.ls_remote_heads(r['Path'], url, timeout=10)
+            remoteHeadsCache.set(url, remoteHeads)
+    except (GitError, OSError, ValueError, asyncio.TimeoutError):
+        # Broken working copy or remote, let fetch and status report the problem
+        return True
+    if r['Branch'] not in remoteHeads:
+        return False
+    return remoteHeads[r['Branch']] != repo.getTrackingRev(r['Branch'])
+
+
+async def plan_fetch(repos: list) -> list:
+    required = await asyncio.gather(*[fetch_required(r) for r in repos])
+    return [r['Path'] for r, fetch in zip(repos, required) if fetch]
+
+
+async def stream_results(coroutines: list):
+    # Yield results in order of completion, a slow repo does not block the others
+    for future in asyncio.as_completed(coroutines):
+        yield await future
+
+
+async def refresh_repo(r: dict) -> dict:
+    if await fetch_required(r):
         try:
-            for result in executor.map(push_repo, repoPaths, timeout=10):
-                results.append(result)
-        except TimeoutError:
-            print('Time out waiting to push git repositories.') 
-    return results
+            await fetch_repo(r)
+        except (GitCommandError, asyncio.TimeoutError, OSError) as e:
+            # Status from outdated remote refs would look up-to-date, keep last known status
+            return {
+                'Path': r['Path'],
+                'status': f"Failed to fetch: {e!r}"
+                }
+    return await get_repo_status(r)
+
+
+async def pull_and_get_status(r: dict) -> tuple:
+    return await pull_repo(r), await get_repo_status(r)
+
+
+async def push_and_get_status(r: dict) -> tuple:
+    return await push_repo(r), await get_repo_status(r)
 
     
-def git_repo_status(repoPath: str) -> str:
-    repoStatus = GitRepo(repoPath).git.status()
-    if 'Your branch is up to date' in repoStatus:
-        repoStatus = "Up-to-Date"
-    elif 'Your branch is ahead' in repoStatus:
+def git_repo_status(status: dict) -> str:
+    if status['ahead'] and status['behind']:
+        repoStatus = 'Pull and Push'
+    elif status['ahead']:
         repoStatus = 'Push your data'
-    elif 'Your branch is behind' in repoStatus:
+    elif status['behind']:
         repoStatus = 'Pull required'
-    elif 'have diverged' in repoStatus:
-        repoStatus = 'Pull and Push'
     else:
         repoStatus = "Up-to-Date"
     
     return repoStatus
 
 
-def get_repo_status(r: dict) -> dict:
-    print(f"GIT: {r['Path']} started!")
+def init_repo_row(r: dict) -> dict:
+    # Row without status, shown until the first status is available
+    return {
+        'Path': r['Path'],
+        'Url': r['Url'],
+        'usedUrl': "",
+        'Branch': r['Branch'],
+        'activeBranch': "",
+        'status': "",
+        'localStatus': None,
+        'remoteStatus': "",
+        'isRepo': Path(r['Path']).joinpath('.git').is_dir()
+        }
+
+
+async def get_repo_status(r: dict) -> dict:
     if Path(r['Path']).is_dir() and Path(r['Path']).joinpath('.git').is_dir():
-        repo = GitRepo(r['Path'])
-        print(f"GIT: {r['Path']} repo object is initialized!")
-        repoStatus = git_repo_status(r['Path'])
-        print(f"GIT: {r['Path']} return result!")
+        try:
+            async with operationMetrics.measure('status', r['Path'], r['Url']):
+                status = await async_git.status(r['Path'], timeout=10)
+            usedUrl = repoRegistry.get(r['Path']).getRemoteUrl()
+        except (GitError, OSError, ValueError, asyncio.TimeoutError) as e:
+            # Keep last known status
+            return {
+                'Path': r['Path'],
+                'status': f"Failed to get status: {e!r}"
+                }
         return {
             'Path': r['Path'],
             'Url': r['Url'],
-            'usedUrl': next(repo.remotes.origin.urls),
+            'usedUrl': usedUrl,
             'Branch': r['Branch'],
-            'activeBranch': repo.active_branch.name,
-            'status': repo.git.status('-s'),
-            'localStatus': repo.is_dirty(untracked_files=True),
-            'remoteStatus': repoStatus,
+            'activeBranch': status['branch'],
+            'status': '\n'.join(status['entries']),
+            'localStatus': status['isDirty'],
+            'remoteStatus': git_repo_status(status),
             'isRepo': True
             }
     else:
-        print(f"GIT: {r['Path']} return result!")
         return {
             'Path': r['Path'],
             'Url': r['Url'],
@@ -134,16 +219,56 @@ def get_repo_status(r: dict) -> dict:
             }
 
 
-def get_multiple_repo_status(repos: list) -> list:
-    repo_status = []
-    with ThreadPoolExecutor() as executor:
-        try:
-            for result in executor.map(get_repo_status, repos, timeout=10):
-                repo_status.append(result)
-        except TimeoutError:
-            print('Time out waiting to get git repository status.') 
-                
-    return repo_status
+async def get_multiple_repo_status(repos: list) -> list:
+    return list(await asyncio.gather(*[get_repo_status(r) for r in repos]))
+
+
+class git_status_engine(status_engine):
+    def __init__(self) -> None:
+        """Status engine of the git repository table, shared by all browser sessions"""
+        super().__init__('git', 'Git')
+
+    def init_repo_row(self, r: dict) -> dict:
+        return init_repo_row(r)
+
+    async def refresh(self, repos: list):
+        self.set_busy(repos)
+        async for result in stream_results([refresh_repo(r) for r in repos]):
+            if self.is_failure(result):
+                self.log(f"{result['Path']}: {result['status']}", True)
+            self.finish([result])
+            yield result
+        self.save_snapshot()
+
+    async def refresh_local_status(self, repoPaths: list) -> None:
+        repos = [self.rows[repoPath] for repoPath in repoPaths if repoPath in self.rows]
+        self.publish(await get_multiple_repo_status(repos))
+
+    async def pull(self, repos: list):
+        self.set_busy(repos)
+        async for result, status in stream_results([pull_and_get_status(r) for r in repos]):
+            self.finish([status])
+            yield result
+        self.save_snapshot()
+
+    async def push(self, repos: list):
+        self.set_busy(repos)
+        async for result, status in stream_results([push_and_get_status(r) for r in repos]):
+            self.finish([status])
+            yield result
+        self.save_snapshot()
+
+    async def clone(self, repo: dict) -> str:
+        self.set_busy([repo])
+        result = await clone_repo(repo['Path'], repo['Url'], repo['Branch'])
+        if not result and self.watcher.active:
+            self.watcher.watch([r['Path'] for r in self.repos])
+        self.finish(await get_multiple_repo_status([repo]))
+        self.save_snapshot()
+        return result
+
+
+gitStatusEngine = git_status_engine()
 
 
 class git_repo_table():
@@ -156,8 +281,9 @@ class git_repo_table():
             self.table._props['columns'] = [column for column in self._columnDefs if column['name'] in self._visibleColumns]
             self.table._props['virtual-scroll'] = False #! If true, column widths change with scrolling
             self.table._props['wrap-cells'] = True
-
-            self.timer = ui.timer(900.0, lambda: background_tasks.create(self.__periodic_update_table(self.table.rows)), active=False)
+            # Time of the last check alone does not make a row change, it is shown with stale rows
+            self._rows = row_index(self.table, passiveFields={'checkedAt'})
+            self.engine = gitStatusEngine
 
             with self.table.add_slot('top-left'):
                 ui.label('Git Repositories').classes('text-h5 font-bold text-primary')
@@ -168,7 +294,7 @@ class git_repo_table():
                     ui.tooltip('Push to remote and update table')
                 with ui.button('Refresh', on_click=lambda: self.update_table(self.table.rows), color='primary', icon='refresh').props('flat'):
                     ui.tooltip('Fetch from remote and update table')
-                with ui.switch(value=False).bind_value(self.timer, 'active').props('icon="autorenew"'):
+                with ui.switch(value=False).bind_value(self.engine, 'autoUpdate').props('icon="autorenew"'):
                     ui.tooltip('Refresh table periodic')
 
             self.table.add_slot('header', r'''
@@ -214,6 +340,10 @@ class git_repo_table():
                         </q-icon>
                     </q-td>
                     <q-td key="remoteStatus" :props="props" v-if="props.row.isRepo==true">
+                        <q-spinner color="primary" v-if="props.row.busy" size="sm" />
+                        <q-icon name="history" color="grey" v-if="props.row.stale" size="sm">
+                            <q-tooltip>Last known status from {{ props.row.checkedAt }}</q-tooltip>
+                        </q-icon>
                         {{ props.row.remoteStatus }}
                         <q-icon name="check_circle" color="green" v-if="props.row.remoteStatus=='Up-to-Date'" size="sm">
                             <q-tooltip>Local repo is up-to-date!</q-tooltip>
@@ -284,9 +414,9 @@ class git_repo_table():
             self.table.on('push', lambda e: self._push_repos([e.args['row']]))
             self.table.on('clone', lambda e: self._clone_repo(e.args['row']))
             
-            self.table.on('open', lambda e: GitRepo(e.args['row']['Path']).openExplorer())
-            self.table.on('bash', lambda e: GitRepo(e.args['row']['Path']).openPowershell())
-            self.table.on('github', lambda e: GitRepo(e.args['row']['Path']).openGithub())
+            self.table.on('open', lambda e: repoRegistry.get(e.args['row']['Path']).openExplorer())
+            self.table.on('bash', lambda e: repoRegistry.get(e.args['row']['Path']).openPowershell())
+            self.table.on('github', lambda e: repoRegistry.get(e.args['row']['Path']).openGithub())
 
     
     def add_logger(self, logger: log_viewer)-> None:
@@ -294,50 +424,47 @@ class git_repo_table():
     
     
     def init_data(self, tableData: dict) -> None:
-        # Fetch given repos
+        # Show rows of the shared status engine, a new repository list is collected in background
         self._log.info_message("Initialize Git repository table...")
-        fetch_repos_parallel([r['Path'] for r in tableData['repo']])
+        self.engine.subscribe(self, self.table.client)
+        if tableData.get('DiscoverRoots'):
+            # Discovered repositories are shown when the scan is done, the scan of an unchanged configuration is reused
+            background_tasks.create(self.engine.load(tableData), name='git_discovery')
+        else:
+            self.engine.configure(tableData)
 
-        # Update table
-        results = get_multiple_repo_status(tableData['repo'])
-        self.table.update_rows(results)
-        
-        # Set timer
-        if 'AutoUpdateTime' in tableData.keys():
-            self.timer.interval = tableData['AutoUpdateTime']
-        if 'AutoUpdate' in tableData.keys():
-            if tableData['AutoUpdate']:
-                self.timer.activate()
-            else:
-                self.timer.deactivate()
-                
-        self._log.info_message("...done!")
 
+    async def reload(self, tableData: dict) -> None:
+        self.engine.subscribe(self, self.table.client)
+        await self.engine.load(tableData, refresh=False, rescan=True)
+        await self.update_table(self.engine.repos)
 
-    async def __periodic_update_table(self, repos: list = []) -> None:
-        self._log.info_message("Update Git repository table...")
-        await run.io_bound(fetch_repos_parallel, [r['Path'] for r in repos])
-        results = await run.cpu_bound(get_multiple_repo_status, repos)
-        self.__update_rows(results)
-        self._log.info_message("...done!")
-        
-    
-    async def update_table(self, repos: list = [], fullList: bool = False) -> None:
+
+    def set_rows(self, rows: list) -> None:
+        self._rows.set_rows(rows)
+
+
+    def update_rows(self, results: list) -> None:
+        self._rows.update(results)
+
+
+    def log_message(self, message: str, warning: bool = False) -> None:
+        # Messages of the engine are written to the log file by the engine
+        if warning:
+            self._log.warning_message(message, toFile=False)
+        else:
+            self._log.info_message(message, toFile=False)
+
+
+    async def update_table(self, repos: list = []) -> None:
         self._log.info_message("Update Git repository table...")
-        for repo in [r['Path'] for r in repos]:
-            self._log.info_message(f"   ....{repo}")
-        n = ui.notification(message='Fetch from remote', spinner=True, timeout=None, color='primary')
-        await asyncio.sleep(0.1)
-        await run.io_bound(fetch_repos_parallel, [r['Path'] for r in repos])
-        n.message = 'Get Git repo status!'
+        n = ui.notification(message='Fetch from remote and get Git repo status!', spinner=True, timeout=None, color='primary')
         await asyncio.sleep(0.1)
-        results = await run.cpu_bound(get_multiple_repo_status, repos)
-        n.message = 'Update Git table!'
-        await asyncio.sleep(0.1)
-        if fullList:
-            self.table.update_rows(results)
-        else:
-            self.__update_rows(results)
+        finished = 0
+        async for result in self.engine.refresh_cycle(repos):
+            finished += 1
+            self._log.info_message(f"   ....{result['Path']}", result['Path'])
+            n.message = f'Update Git table! ({finished}/{len(repos)})'
         n.message = 'Done!'
         n.spinner = False
         await asyncio.sleep(0.5)
@@ -347,20 +474,17 @@ class git_repo_table():
 
     async def _pull_repos(self, repos: list = []) -> None:
         self._log.info_message("Pull Git repositories...")
+        repos = [r for r in repos if r['isRepo']]
         n = ui.notification(message='Pull from remote', spinner=True, timeout=None, color='primary')
         await asyncio.sleep(0.1)
-        results = await run.io_bound(pull_repos_parallel, [r['Path'] for r in repos if r['isRepo']])
-        for result in results:
+        finished = 0
+        async for result in self.engine.pull(repos):
+            finished += 1
             if result['Error']:
-                self._log.warning_message(f"{result['Path']}:\n{result['Message']}")
+                self._log.warning_message(f"{result['Path']}:\n{result['Message']}", result['Path'])
             else:
-                self._log.info_message(f"{result['Path']}:\n{result['Message']}")
-        await asyncio.sleep(0.5)
-        n.message = 'Get Git repo status!'
-        results = await run.cpu_bound(get_multiple_repo_status, repos)
-        n.message = 'Update Git table!'
-        await asyncio.sleep(0.5)
-        self.__update_rows(results)
+                self._log.info_message(f"{result['Path']}:\n{result['Message']}", result['Path'])
+            n.message = f'Update Git table! ({finished}/{len(repos)})'
         n.message = 'Done!'
         n.spinner = False
         await asyncio.sleep(1)
@@ -370,20 +494,17 @@ class git_repo_table():
     
     async def _push_repos(self, repos: list = []) -> None:
         self._log.info_message("Push Git repositories...")
+        repos = [r for r in repos if r['remoteStatus'] == 'Push your data']
         n = ui.notification(message='Push to remote', spinner=True, timeout=None, color='primary')
         await asyncio.sleep(0.1)
-        results = await run.io_bound(push_repos_parallel, [r['Path'] for r in repos if r['remoteStatus'] == 'Push your data'])
-        for result in results:
+        finished = 0
+        async for result in self.engine.push(repos):
+            finished += 1
             if result['Error']:
-                self._log.warning_message(f"{result['Path']}:\n{result['Message']}")
+                self._log.warning_message(f"{result['Path']}:\n{result['Message']}", result['Path'])
             else:
-                self._log.info_message(f"{result['Path']}:\n{result['Message']}")
-        await asyncio.sleep(0.5)
-        n.message = 'Get Git repo status!'
-        results = await run.cpu_bound(get_multiple_repo_status, repos)
-        n.message = 'Update Git table!'
-        await asyncio.sleep(0.5)
-        self.__update_rows(results)
+                self._log.info_message(f"{result['Path']}:\n{result['Message']}", result['Path'])
+            n.message = f'Update Git table! ({finished}/{len(repos)})'
         n.message = 'Done!'
         n.spinner = False
         await asyncio.sleep(1)
@@ -481,25 +602,14 @@ class git_repo_table():
         ]
 
     
-    def __update_rows(self, results: list = []) -> None:
-        for result in results:
-            for row in self.table.rows:
-                if row['Path'] == result['Path']:
-                    row.update(result)
-    
-        self.table.update()
-
-
     async def _clone_repo(self, repo: dict = {}) -> None:
-        self._log.info_message(f"Clone to {repo['Path']} ...")
+        self._log.info_message(f"Clone to {repo['Path']} ...", repo['Path'])
         n = ui.notification(message='Clone from remote', spinner=True, timeout=None, color='primary')
         await asyncio.sleep(0.1)
-        result = await run.io_bound(clone_repo, repo['Path'], repo['Url'], repo['Branch'])
+        result = await self.engine.clone(repo)
         if result:
-            self._log.warning_message(f"{result}")
-        results = await run.cpu_bound(get_multiple_repo_status, [repo])
+            self._log.warning_message(f"{result}", repo['Path'])
         await asyncio.sleep(0.1)
-        self.__update_rows(results)
         n.message = 'Done!'
         n.spinner = False
         await asyncio.sleep(1)
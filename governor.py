@@ -0,0 +1,89 @@
+from contextlib import asynccontextmanager
+from pathlib import Path
+from urllib.parse import urlsplit
+import asyncio
+import os
+import re
+
+
+# Default limits, can be changed in the [governor] section of the config file
+NETWORK_LIMIT_PER_HOST = 4
+DISK_LIMIT_PER_VOLUME = 4
+
+# scp-like git url: [user@]host:path
+SCP_URL = re.compile(r'^(?:[^@/\\]+@)?([^:/\\]+):')
+
+
+def remote_host(url: str) -> str:
+    """Host of a git/svn remote url, 'local' for local paths and file:// urls"""
+    if '://' in url:
+        parts = urlsplit(url)
+        if parts.scheme == 'file' or not parts.hostname:
+            return 'local'
+        return parts.hostname.lower()
+    match = SCP_URL.match(url)
+    # Single letter is a Windows drive (C:/...)
+    if match and len(match.group(1)) > 1:
+        return match.group(1).lower()
+    return 'local'
+
+
+def disk_volume(path: str) -> str:
+    """Drive of a path on Windows, device of the nearest existing folder otherwise"""
+    path = Path(os.path.abspath(path))
+    drive = path.drive
+    if drive:
+        return drive.upper()
+    while not path.exists() and path != path.parent:
+        path = path.parent
+    try:
+        return str(os.stat(path).st_dev)
+    except OSError:
+        return path.anchor
+
+
+class resource_governor():
+    def __init__(self, networkLimit: int = NETWORK_LIMIT_PER_HOST, diskLimit: int = DISK_LIMIT_PER_VOLUME) -> None:
+        """Limit concurrent network operations per remote host and working tree operations per disk volume
+
+        Network and disk phases of different repositories overlap, but no host or volume gets more
+        than its limit. If an operation needs both, network is acquired first.
+
+        :param networkLimit: Maximum number of concurrent network operations per remote host.
+        :param diskLimit: Maximum number of concurrent working tree operations per disk volume.
+        """
+        self.networkLimit = networkLimit
+        self.diskLimit = diskLimit
+        self._hosts = {}
+        self._volumes = {}
+
+    def configure(self, governorData: dict) -> None:
+        """Apply [governor] section of the config file (NetworkLimitPerHost, DiskLimitPerVolume)"""
+        networkLimit = governorData.get('NetworkLimitPerHost', NETWORK_LIMIT_PER_HOST)
+        diskLimit = governorData.get('DiskLimitPerVolume', DISK_LIMIT_PER_VOLUME)
+        if networkLimit != self.networkLimit:
+            # Running operations release their old semaphore
+            self.networkLimit = networkLimit
+            self._hosts = {}
+        if diskLimit != self.diskLimit:
+            self.diskLimit = diskLimit
+            self._volumes = {}
+
+    @staticmethod
+    def _get_semaphore(semaphores: dict, key: str, limit: int) -> asyncio.Semaphore:
+        if key not in semaphores:
+            semaphores[key] = asyncio.Semaphore(limit)
+        return semaphores[key]
+
+    @asynccontextmanager
+    async def network(self, url: str):
+        async with self._get_semaphore(self._hosts, remote_host(url), self.networkLimit):
+            yield
+
+    @asynccontextmanager
+    async def disk(self, path: str):
+        async with self._get_semaphore(self._volumes, disk_volume(path), self.diskLimit):
+            yield
+
+
+resourceGovernor = resource_governor()
@@ -1,16 +1,125 @@
 from nicegui import ui
+from collections import deque
 from datetime import datetime
+from logging.handlers import RotatingFileHandler
+import logging
+
+from status_snapshot import SNAPSHOT_DIR
+
+
+# Default number of lines kept by a log viewer
+LOG_MAX_LINES = 1000
+
+# Time in seconds between two transfers of new lines to the browser
+LOG_FLUSH_INTERVAL = 0.5
+
+LEVELS = {'Info': logging.INFO, 'Warning': logging.WARNING}
+
+
+class log_file():
+    def __init__(self, directory=SNAPSHOT_DIR, maxBytes: int = 1024 * 1024, backupCount: int = 3) -> None:
+        """Process wide rotating log file, messages of all browser sessions are written once
+
+        :param directory: Directory of the log file (repo_viewer.log).
+        :param maxBytes: Size of the log file before it is rotated.
+        :param backupCount: Number of rotated log files which are kept.
+        """
+        self.directory = directory
+        self.maxBytes = maxBytes
+        self.backupCount = backupCount
+        self.enabled = True
+        self.level = logging.INFO
+        self._logger = logging.getLogger('LocalRepoViewer')
+        self._logger.propagate = False
+        self._handler = None
+
+    def configure(self, logData: dict) -> None:
+        """Apply [log] section of the config file (File, FileLevel, FileMaxBytes, FileBackupCount)"""
+        self.enabled = logData.get('File', True)
+        self.level = LEVELS.get(logData.get('FileLevel', 'Info'), logging.INFO)
+        maxBytes = logData.get('FileMaxBytes', self.maxBytes)
+        backupCount = logData.get('FileBackupCount', self.backupCount)
+        if (maxBytes, backupCount) != (self.maxBytes, self.backupCount):
+            self.maxBytes = maxBytes
+            self.backupCount = backupCount
+            self.close()
+
+    def write(self, level: str, message: str, repo: str = None) -> None:
+        if not self.enabled or LEVELS[level] < self.level:
+            return
+        if self._handler is None:
+            self.__open()
+        self._logger.log(LEVELS[level], f"{repo}: {message}" if repo and repo not in message else message)
+
+    def close(self) -> None:
+        if self._handler is not None:
+            self._logger.removeHandler(self._handler)
+            self._handler.close()
+            self._handler = None
+
+    def __open(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._handler = RotatingFileHandler(self.directory.joinpath('repo_viewer.log'), maxBytes=self.maxBytes,
+                                            backupCount=self.backupCount, encoding='utf-8', delay=True)
+        self._handler.setFormatter(logging.Formatter('%(asctime)s [%(levelname)s] %(message)s'))
+        self._logger.addHandler(self._handler)
+        self._logger.setLevel(logging.DEBUG)
+
+
+logFile = log_file()
+
 
 class log_viewer():
-    def __init__(self,max_lines: int = None) -> None:
+    def __init__(self, max_lines: int = LOG_MAX_LINES, flush_interval: float = LOG_FLUSH_INTERVAL) -> None:
+        """Log of one browser session, the last max_lines messages are kept
+
+        New lines are collected and sent to the browser together every flush_interval seconds.
+        Shown lines can be filtered by minimum level and repository.
+        """
+        self._entries = deque(maxlen=max_lines)
+        self._pending = []
+        with ui.row().classes('w-full items-center'):
+            self.level = ui.select(list(LEVELS), value='Info', label='Level', on_change=self.__show_entries).classes('w-32')
+            self.repo = ui.input(label='Repository filter', on_change=self.__show_entries).props('clearable').classes('w-96')
         self.log = ui.log(max_lines=max_lines).classes('w-full h-40')
-        
-        
-    def info_message(self, message:str) -> None:
-        self.log.push(f"[{datetime.now().strftime('%X.%f')[0:8]}] [Info] {message}")
-        self.log.update()
-        
-        
-    def warning_message(self, message:str) -> None:
-        self.log.push(f"[{datetime.now().strftime('%X.%f')[0:8]}] [Warning] {message}")
-        self.log.update()
+        self.timer = ui.timer(flush_interval, self.flush)
+
+
+    def info_message(self, message: str, repo: str = None, toFile: bool = True) -> None:
+        self.__add('Info', message, repo, toFile)
+
+
+    def warning_message(self, message: str, repo: str = None, toFile: bool = True) -> None:
+        self.__add('Warning', message, repo, toFile)
+
+
+    def flush(self) -> None:
+        # All new lines with one message to the browser
+        if self._pending:
+            self.log.push('\n'.join(self._pending))
+            self._pending = []
+
+
+    def __add(self, level: str, message: str, repo: str, toFile: bool) -> None:
+        entry = (f"[{datetime.now().strftime('%X.%f')[0:8]}] [{level}] {message}", level, repo)
+        self._entries.append(entry)
+        if toFile:
+            logFile.write(level, message, repo)
+        if self.__is_shown(entry):
+            self._pending.append(entry[0])
+            if self._entries.maxlen and len(self._pending) > self._entries.maxlen:
+                del self._pending[:-self._entries.maxlen]
+
+
+    def __is_shown(self, entry: tuple) -> bool:
+        _, level, repo = entry
+        if LEVELS[level] < LEVELS[self.level.value or 'Info']:
+            return False
+        repoFilter = (self.repo.value or '').lower()
+        return not repoFilter or (repo is not None and repoFilter in repo.lower())
+
+
+    def __show_entries(self) -> None:
+        self.log.clear()
+        self._pending = [line for line, level, repo in self._entries if self.__is_shown((line, level, repo))]
+        self.flush()
@@ -1,9 +1,14 @@
-from nicegui import ui
+from nicegui import ui, app
+from fastapi.responses import PlainTextResponse
 from pathlib import Path
 from repo_viewer import repo_viewer
+from metrics import operationMetrics
+from profiler import refreshProfiler
 
 
-def main(configFile: str) -> None:
+def main(configFile: str, profileCycles: int = 0) -> None:
+    if profileCycles:
+        refreshProfiler.start(profileCycles)
 
     @ui.page('/')
     def frame():
@@ -12,6 +17,11 @@ def main(configFile: str) -> None:
         with ui.column().classes('w-full'):
             repo_viewer(configFile)
 
+    @app.get('/metrics')
+    def metrics() -> PlainTextResponse:
+        # Prometheus text exposition format
+        return PlainTextResponse(operationMetrics.exposition(), media_type='text/plain; version=0.0.4')
+
     ui.run(reload=False, \
         show=False, \
         title='Repository Viewer', \
@@ -26,9 +36,10 @@ if __name__ in {'__main__', '__mp_main__'}:
 
     parser = argparse.ArgumentParser(description="Start Repository Viewer")
     parser.add_argument("ConfigFile", type=str, help="Path to config file.")
+    parser.add_argument("--profile", type=int, default=0, metavar="N", help="Profile the first N refresh cycles.")
     args = parser.parse_args()
 
-    main(args.ConfigFile)
+    main(args.ConfigFile, args.profile)
 
     #main(Path(__file__).parent.joinpath('config_private.toml'))
     #main(Path(__file__).parent.joinpath('config.toml'))
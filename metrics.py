@@ -0,0 +1,122 @@
+from contextlib import asynccontextmanager
+import asyncio
+import bisect
+import threading
+import time
+
+from governor import remote_host
+
+
+# Upper bounds in seconds of the duration histogram buckets
+DURATION_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _label_value(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels: str) -> str:
+    return ','.join(f'{name}="{_label_value(value)}"' for name, value in labels.items())
+
+
+class operation_metrics():
+    def __init__(self, buckets: tuple = DURATION_BUCKETS) -> None:
+        """Duration histograms, outcomes and transferred bytes of repository operations, kept in memory
+
+        Each series is keyed by operation (fetch, status, pull, ...), repository path and remote host.
+
+        :param buckets: Upper bounds in seconds of the duration histogram buckets.
+        """
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def record(self, operation: str, repoPath: str, host: str, duration: float, outcome: str = 'ok', bytes: int = 0) -> None:
+        """Add one operation to the metrics
+
+        :param operation: Name of the operation.
+        :param repoPath: Path of the repository.
+        :param host: Remote host of the repository.
+        :param duration: Duration in seconds.
+        :param outcome: 'ok', 'error' or 'timeout'.
+        :param bytes: Number of bytes transferred over the network.
+        """
+        with self._lock:
+            key = (operation, repoPath, host)
+            if key not in self._series:
+                self._series[key] = {'buckets': [0] * (len(self.buckets) + 1), 'sum': 0.0, 'count': 0,
+                                     'max': 0.0, 'outcomes': {}, 'bytes': 0}
+            series = self._series[key]
+            series['buckets'][bisect.bisect_left(self.buckets, duration)] += 1
+            series['sum'] += duration
+            series['count'] += 1
+            series['max'] = max(series['max'], duration)
+            series['outcomes'][outcome] = series['outcomes'].get(outcome, 0) + 1
+            series['bytes'] += bytes
+
+    @asynccontextmanager
+    async def measure(self, operation: str, repoPath: str, url: str = ''):
+        """Measure duration of the enclosed operation, exceptions count as 'error' or 'timeout'
+
+        Yields a sample dict, the operation may set 'outcome' and 'bytes'.
+        """
+        sample = {'outcome': 'ok', 'bytes': 0}
+        start = time.perf_counter()
+        try:
+            yield sample
+        except asyncio.TimeoutError:
+            sample['outcome'] = 'timeout'
+            raise
+        except Exception:
+            sample['outcome'] = 'error'
+            raise
+        finally:
+            self.record(operation, repoPath, remote_host(url) if url else '', time.perf_counter() - start,
+                        sample['outcome'], sample['bytes'])
+
+    def summary(self) -> list:
+        """One row per operation and repository, slowest mean duration first"""
+        with self._lock:
+            rows = [{
+                'operation': operation,
+                'repo': repoPath,
+                'host': host,
+                'count': series['count'],
+                'failed': series['count'] - series['outcomes'].get('ok', 0),
+                'mean': series['sum'] / series['count'],
+                'max': series['max'],
+                'bytes': series['bytes'],
+                } for (operation, repoPath, host), series in self._series.items()]
+        return sorted(rows, key=lambda row: row['mean'], reverse=True)
+
+    def exposition(self) -> str:
+        """All metrics in Prometheus text exposition format"""
+        lines = [
+            '# HELP repo_operation_duration_seconds Duration of repository operations.',
+            '# TYPE repo_operation_duration_seconds histogram']
+        outcomeLines = [
+            '# HELP repo_operations_total Number of repository operations by outcome.',
+            '# TYPE repo_operations_total counter']
+        bytesLines = [
+            '# HELP repo_transferred_bytes_total Bytes transferred over the network by repository operations.',
+            '# TYPE repo_transferred_bytes_total counter']
+        with self._lock:
+            for (operation, repoPath, host), series in sorted(self._series.items()):
+                labels = _labels(operation=operation, repo=repoPath, host=host)
+                cumulative = 0
+                for bound, count in zip((*self.buckets, '+Inf'), series['buckets']):
+                    cumulative += count
+                    lines.append(f'repo_operation_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                lines.append(f'repo_operation_duration_seconds_sum{{{labels}}} {series["sum"]:.6f}')
+                lines.append(f'repo_operation_duration_seconds_count{{{labels}}} {series["count"]}')
+                for outcome, count in sorted(series['outcomes'].items()):
+                    outcomeLines.append(f'repo_operations_total{{{labels},outcome="{outcome}"}} {count}')
+                bytesLines.append(f'repo_transferred_bytes_total{{{labels}}} {series["bytes"]}')
+        return '\n'.join(lines + outcomeLines + bytesLines) + '\n'
+
+    def clear(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+operationMetrics = operation_metrics()
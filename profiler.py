@@ -0,0 +1,91 @@
+from nicegui import run
+from contextlib import asynccontextmanager
+from datetime import datetime
+import cProfile
+import io
+import pstats
+
+from status_snapshot import SNAPSHOT_DIR
+
+
+# Default number of refresh cycles profiled after profiling was started
+PROFILE_CYCLES = 3
+
+# Number of functions listed in the summary of a profile
+PROFILE_TOP_FUNCTIONS = 30
+
+
+class refresh_profiler():
+    def __init__(self, directory=SNAPSHOT_DIR.joinpath('profiles'), top: int = PROFILE_TOP_FUNCTIONS) -> None:
+        """Deterministic profiling (cProfile) of the next refresh cycles
+
+        Everything running in the event loop thread during a cycle is recorded: GitPython parsing,
+        subprocess handling, pickling for worker processes and NiceGUI rendering. Work inside worker
+        processes and threads (run.cpu_bound, run.io_bound) is not recorded. Each cycle is saved as
+        <table>_<time>.prof (call tree, e.g. for snakeviz) and .txt (top self-time functions).
+
+        :param directory: Directory of the profile files.
+        :param top: Number of functions listed in the summary.
+        """
+        self.directory = directory
+        self.top = top
+        self.cycles = 0
+        self._profile = None
+
+    @property
+    def active(self) -> bool:
+        return self.cycles > 0
+
+    @active.setter
+    def active(self, value: bool) -> None:
+        # Switch in the UI starts profiling of the default number of cycles
+        if value and not self.active:
+            self.start()
+        elif not value:
+            self.stop()
+
+    def start(self, cycles: int = PROFILE_CYCLES) -> None:
+        self.cycles = cycles
+
+    def stop(self) -> None:
+        self.cycles = 0
+
+    @asynccontextmanager
+    async def cycle(self, name: str, log=None):
+        """Profile the enclosed refresh cycle if profiling is active
+
+        Yields path of the profile file, None if the cycle is not profiled. The profile is saved
+        in a thread, the result is reported to log(message, warning) (optional).
+        """
+        # Only one profiler can be enabled, overlapping cycles are not profiled
+        if not self.active or self._profile is not None:
+            yield None
+            return
+        self.cycles -= 1
+        filePath = self.directory.joinpath(f"{name}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.prof")
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+        try:
+            yield filePath
+        finally:
+            self._profile.disable()
+            profile, self._profile = self._profile, None
+            try:
+                await run.io_bound(self.__save, profile, filePath)
+                if log is not None:
+                    log(f"Profile of {name} refresh saved to {filePath}")
+            except Exception as e:
+                if log is not None:
+                    log(f"Profile of {name} refresh not saved: {e!r}", True)
+
+    def __save(self, profile: cProfile.Profile, filePath) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        profile.dump_stats(filePath)
+        summary = io.StringIO()
+        stats = pstats.Stats(profile, stream=summary).strip_dirs()
+        stats.sort_stats(pstats.SortKey.TIME).print_stats(self.top)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.top)
+        filePath.with_suffix('.txt').write_text(summary.getvalue(), encoding='utf-8')
+
+
+refreshProfiler = refresh_profiler()
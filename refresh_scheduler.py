@@ -0,0 +1,95 @@
+import random
+import time
+
+from status_snapshot import TRANSIENT_FIELDS
+
+
+# Dormant repositories are checked at most this many times less often than AutoUpdateTime
+MAX_INTERVAL_FACTOR = 8
+
+# Next check time is spread by +/- this fraction of the interval
+JITTER = 0.1
+
+# Row fields which do not tell if a repository changed
+IGNORED_FIELDS = TRANSIENT_FIELDS | {'checkedAt'}
+
+
+def _signature(row: dict) -> tuple:
+    return tuple(sorted((field, str(value)) for field, value in row.items() if field not in IGNORED_FIELDS))
+
+
+class refresh_scheduler():
+    def __init__(self, interval: float = 900.0, maxInterval: float = None) -> None:
+        """Next check time per repository, adapted to how often the repository changed recently
+
+        A repository whose status changed is checked again after the base interval. Each check
+        without change doubles its interval up to maxInterval, each failed check doubles the
+        waiting time as well (backoff). A repository with its own AutoUpdateTime in the config
+        file is always checked after this time (failures still back off).
+
+        :param interval: Base interval in seconds (AutoUpdateTime of the table).
+        :param maxInterval: Longest interval in seconds for dormant or failing repositories.
+        """
+        self.interval = interval
+        self.maxInterval = maxInterval or interval * MAX_INTERVAL_FACTOR
+        self._overrides = {}
+        self._intervals = {}
+        self._failures = {}
+        self._signatures = {}
+        self._nextChecks = {}
+
+    def configure(self, repos: list, interval: float, maxInterval: float = None) -> None:
+        """Apply repository list and intervals, state of remaining repositories is kept
+
+        :param repos: Repository entries of the config file, optional key AutoUpdateTime.
+        :param interval: Base interval in seconds.
+        :param maxInterval: Longest interval in seconds. Defaults to 8 times the base interval.
+        """
+        self.interval = interval
+        self.maxInterval = maxInterval or interval * MAX_INTERVAL_FACTOR
+        self._overrides = {r['Path']: r['AutoUpdateTime'] for r in repos if 'AutoUpdateTime' in r}
+        repoPaths = {r['Path'] for r in repos}
+        for state in (self._intervals, self._failures, self._signatures, self._nextChecks):
+            for repoPath in [repoPath for repoPath in state if repoPath not in repoPaths]:
+                del state[repoPath]
+        now = time.monotonic()
+        for r in repos:
+            if r['Path'] not in self._nextChecks:
+                # First checks of new repositories are spread over one interval
+                self._nextChecks[r['Path']] = now + random.uniform(0, self.__base_interval(r['Path']))
+
+    def remember(self, row: dict) -> None:
+        """Remember status of a row without counting it as check (e.g. row of the snapshot file)"""
+        self._signatures.setdefault(row['Path'], _signature(row))
+
+    def record(self, result: dict, failed: bool = False) -> None:
+        """Schedule next check of a repository after a status result
+
+        :param result: Row of the repository with its current status.
+        :param failed: The status could not be determined.
+        """
+        repoPath = result['Path']
+        if repoPath not in self._nextChecks:
+            return
+        baseInterval = self.__base_interval(repoPath)
+        if failed:
+            self._failures[repoPath] = self._failures.get(repoPath, 0) + 1
+            interval = min(baseInterval * 2 ** self._failures[repoPath], max(self.maxInterval, baseInterval))
+        else:
+            self._failures.pop(repoPath, None)
+            signature = _signature(result)
+            if repoPath in self._overrides or signature != self._signatures.get(repoPath):
+                interval = baseInterval
+            else:
+                interval = min(self._intervals.get(repoPath, baseInterval) * 2, max(self.maxInterval, baseInterval))
+            self._signatures[repoPath] = signature
+            self._intervals[repoPath] = interval
+        self._nextChecks[repoPath] = time.monotonic() + interval * random.uniform(1 - JITTER, 1 + JITTER)
+
+    def due(self) -> list:
+        """Paths of all repositories whose next check time has passed"""
+        now = time.monotonic()
+        return [repoPath for repoPath, nextCheck in self._nextChecks.items() if nextCheck <= now]
+
+    def __base_interval(self, repoPath: str) -> float:
+        return self._overrides.get(repoPath, self.interval)
@@ -13,9 +13,12 @@ import asyncio
 from local_file_picker import local_file_picker
 
 from system_helpers import copy2clipboard
-from log_viewer import log_viewer
+from log_viewer import log_viewer, logFile, LOG_MAX_LINES
 from git_repo_table import git_repo_table
 from svn_repo_table import svn_repo_table
+from governor import resourceGovernor
+from stats_panel import stats_panel
+from profiler import refreshProfiler, PROFILE_CYCLES
 
 async def pick_file(initialDir: str) -> str:
     result = await local_file_picker(initialDir, multiple=False)
@@ -33,8 +36,11 @@ class repo_viewer():
         # File handling
         with ui.row().classes('w-full items-center justify-between'):
             self.config_file_handler()
-            with ui.button(on_click=app.shutdown).props('flat color=primary icon=exit_to_app'):
-                ui.tooltip('Close application')
+            with ui.row().classes('items-center'):
+                with ui.switch('Profile').bind_value(refreshProfiler, 'active').props('icon="speed"'):
+                    ui.tooltip(f'Profile the next {PROFILE_CYCLES} refresh cycles ({refreshProfiler.directory})')
+                with ui.button(on_click=app.shutdown).props('flat color=primary icon=exit_to_app'):
+                    ui.tooltip('Close application')
                 
         # Build up git repo table
         self.git_repo_table = git_repo_table()
@@ -46,8 +52,11 @@ class repo_viewer():
         if 'svn_table' not in self._config.keys():
             self.svn_repo_table.table.visible = False
 
+        # Build up operation statistics
+        self.stats = stats_panel()
+
         # Build up logger
-        self.log = log_viewer()
+        self.log = log_viewer(max_lines=self._config.get('log', {}).get('MaxLines', LOG_MAX_LINES))
 
         # Add logger to table and update tables
         self.git_repo_table.add_logger(self.log)
@@ -65,6 +74,9 @@ class repo_viewer():
                 self._config = tomli.load(f)
         except tomli.TOMLDecodeError:
             self._config = None
+            return
+        resourceGovernor.configure(self._config.get('governor', {}))
+        logFile.configure(self._config.get('log', {}))
 
 
     def config_file_handler(self) -> None:
@@ -97,39 +109,19 @@ class repo_viewer():
         # load config file
         self._load_config()
         
-        # Update tables
+        # Update tables (status engines are shared by all browser sessions)
         if 'git_table' in self._config.keys():
-            await self.git_repo_table.update_table(self._config['git_table']['repo'], fullList=True)
             self.git_repo_table.table.visible = True
-            
-            # Set timer
-            if 'AutoUpdateTime' in self._config['git_table'].keys():
-                self.git_repo_table.timer.interval = self._config['git_table']['AutoUpdateTime']
-            if 'AutoUpdate' in self._config['git_table'].keys():
-                if self._config['git_table']['AutoUpdate']:
-                    self.git_repo_table.timer.activate()
-                else:
-                    self.git_repo_table.timer.deactivate()
-            
+            await self.git_repo_table.reload(self._config['git_table'])
         else:
             self.git_repo_table.table.visible = False
-            self.git_repo_table.timer.deactivate()
+            self.git_repo_table.engine.clear()
             
         await asyncio.sleep(0.5)
             
         if 'svn_table' in self._config.keys():
-            await self.svn_repo_table.update_table(self._config['svn_table']['repo'], fullList=True)
             self.svn_repo_table.table.visible = True
-            
-            # Set timer
-            if 'AutoUpdateTime' in self._config['svn_table'].keys():
-                self.svn_repo_table.timer.interval = self._config['svn_table']['AutoUpdateTime']
-            if 'AutoUpdate' in self._config['svn_table'].keys():
-                if self._config['svn_table']['AutoUpdate']:
-                    self.svn_repo_table.timer.activate()
-                else:
-                    self.svn_repo_table.timer.deactivate()
-            
+            await self.svn_repo_table.reload(self._config['svn_table'])
         else:
             self.svn_repo_table.table.visible = False
-            self.svn_repo_table.timer.deactivate()
+            self.svn_repo_table.engine.clear()
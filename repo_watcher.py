@@ -0,0 +1,101 @@
+from nicegui import background_tasks
+from nicegui.client import Client
+from fnmatch import translate
+from pathlib import Path
+import asyncio
+import os
+import re
+
+from watchfiles import awatch, Change
+
+
+# Only these entries of the admin folders change the status of a working copy
+GIT_ADMIN_ENTRIES = {'HEAD', 'index', 'refs', 'packed-refs', 'MERGE_HEAD'}
+SVN_ADMIN_ENTRIES = {'wc.db'}
+
+# Changes of build output and temporary files do not trigger a refresh (refresh storms during builds)
+IGNORED_FOLDERS = {'slprj', '__pycache__', '.vs', '.idea', 'node_modules', '.pytest_cache', '.mypy_cache'}
+IGNORED_FILES = re.compile('|'.join(translate(pattern) for pattern in (
+    '*.tmp', '*.temp', '*~', '*.swp', '*.swx', '*.bak', '*.asv', '*.autosave', '~$*', '.#*',
+    '*.pyc', '*.pyo', '*.obj', '*.o', '*.slxc', '*.mexw64')), re.IGNORECASE)
+
+
+def _normalize(path: str) -> str:
+    return os.path.normcase(os.path.normpath(path))
+
+
+def _watch_filter(change: Change, path: str) -> bool:
+    if path.endswith('.lock'):
+        return False
+    parts = Path(path).parts
+    if IGNORED_FOLDERS.intersection(parts) or IGNORED_FILES.match(parts[-1]):
+        return False
+    if '.git' in parts:
+        entries = parts[parts.index('.git') + 1:]
+        return bool(entries) and entries[0] in GIT_ADMIN_ENTRIES
+    if '.svn' in parts:
+        entries = parts[parts.index('.svn') + 1:]
+        return bool(entries) and entries[0] in SVN_ADMIN_ENTRIES
+    return True
+
+
+class repo_watcher():
+    def __init__(self, callback, client: Client = None, debounce: int = 800, step: int = 100, on_error=None) -> None:
+        """Watch local working copies and report changed repositories
+
+        :param callback: Coroutine function called with the list of changed repository paths.
+        :param client: Client which owns the watcher, watching stops if the client is deleted.
+        :param debounce: Maximum time in ms to collect changes before the callback is called.
+        :param step: Time in ms without further changes before the callback is called.
+        :param on_error: Function called with the exception if the callback fails.
+        """
+        self._callback = callback
+        self._onError = on_error
+        self._client = client
+        self._debounce = debounce
+        self._step = step
+        self._stopEvent = None
+        self.paths = []
+
+    @property
+    def active(self) -> bool:
+        return self._stopEvent is not None and not self._stopEvent.is_set()
+
+    def watch(self, repoPaths: list) -> None:
+        """(Re)start watching of given repository paths. Paths which do not exist are skipped."""
+        self.stop()
+        self.paths = [p for p in repoPaths if Path(p).is_dir()]
+        if not self.paths:
+            return
+        self._stopEvent = asyncio.Event()
+        background_tasks.create(self.__watch(self.paths, self._stopEvent), name='repo_watcher')
+
+    def stop(self) -> None:
+        if self._stopEvent is not None:
+            self._stopEvent.set()
+            self._stopEvent = None
+
+    def _should_stop(self) -> bool:
+        return self._client is not None and self._client.id not in Client.instances
+
+    async def __watch(self, repoPaths: list, stopEvent: asyncio.Event) -> None:
+        # Longest path first, so nested working copies are assigned to the innermost repository
+        roots = sorted(((_normalize(p), p) for p in repoPaths), key=lambda x: len(x[0]), reverse=True)
+        async for changes in awatch(*repoPaths, watch_filter=_watch_filter, debounce=self._debounce, step=self._step,
+                                    stop_event=stopEvent, rust_timeout=5000, yield_on_timeout=True):
+            if self._should_stop():
+                stopEvent.set()
+                break
+            changedRepos = set()
+            for _, path in changes:
+                path = _normalize(path)
+                for root, repoPath in roots:
+                    if path == root or path.startswith(root + os.sep):
+                        changedRepos.add(repoPath)
+                        break
+            if changedRepos:
+                try:
+                    await self._callback(sorted(changedRepos))
+                except Exception as e:
+                    if self._onError is not None:
+                        self._onError(e)
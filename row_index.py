@@ -0,0 +1,71 @@
+from nicegui import ui
+import json
+
+
+# Apply field changes to the rows of a table on the client without sending all rows
+PATCH_ROWS_JS = '''
+(() => {
+    const element = window.app.elements[%d];
+    if (element === undefined) return;
+    const changes = %s;
+    for (const row of element.props.rows) {
+        if (row[%s] in changes) Object.assign(row, changes[row[%s]]);
+    }
+})()
+'''
+
+
+class row_index():
+    def __init__(self, table: ui.table, key: str = 'Path', passiveFields: set = set()) -> None:
+        """Index of table rows with field level change detection
+
+        Changes of passive fields (e.g. time of the last check) alone are not sent, they are sent
+        together with the next change of another field of the row.
+
+        :param table: Table which rows are indexed.
+        :param key: Row field which identifies a row.
+        :param passiveFields: Fields whose changes alone do not count as change of the row.
+        """
+        self._table = table
+        self._key = key
+        self._passiveFields = set(passiveFields)
+        self._rows = {row[key]: row for row in table.rows}
+        self._pending = {}
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._rows
+
+    def get(self, key: str) -> dict:
+        return self._rows.get(key)
+
+    def set_rows(self, rows: list) -> None:
+        """Replace all rows of the table (sends the complete table)"""
+        self._table.update_rows(rows)
+        self._rows = {row[self._key]: row for row in self._table.rows}
+        self._pending = {}
+
+    def update(self, results: list) -> int:
+        """Update fields of indexed rows and send only changed fields to the client
+
+        :param results: Partial rows, each identified by the key field.
+        :return: Number of changed rows.
+        """
+        changes = {}
+        for result in results:
+            rowKey = result[self._key]
+            row = self._rows.get(rowKey)
+            if row is None:
+                continue
+            rowChanges = {field: value for field, value in result.items() if row.get(field) != value}
+            row.update(rowChanges)
+            pending = self._pending.setdefault(rowKey, set())
+            pending.update(field for field in rowChanges if field in self._passiveFields)
+            if any(field not in self._passiveFields for field in rowChanges):
+                rowChanges.update({field: row[field] for field in pending})
+                pending.clear()
+                changes.setdefault(rowKey, {}).update(rowChanges)
+
+        if changes:
+            key = json.dumps(self._key)
+            self._table.client.run_javascript(PATCH_ROWS_JS % (self._table.id, json.dumps(changes), key, key))
+        return len(changes)
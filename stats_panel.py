@@ -0,0 +1,45 @@
+from nicegui import ui
+
+from metrics import operationMetrics
+
+
+def _format_bytes(size: int) -> str:
+    for unit in ('B', 'KiB', 'MiB'):
+        if size < 1024:
+            return f'{size:.0f} {unit}' if unit == 'B' else f'{size:.1f} {unit}'
+        size /= 1024
+    return f'{size:.1f} GiB'
+
+
+class stats_panel():
+    def __init__(self, interval: float = 5.0) -> None:
+        """Collapsible table of operation metrics per repository, slowest operations first
+
+        :param interval: Refresh interval of the table in seconds (only while expanded).
+        """
+        columns = [
+            {'name': 'operation', 'label': 'Operation', 'field': 'operation', 'align': 'left', 'sortable': True},
+            {'name': 'repo', 'label': 'Repository', 'field': 'repo', 'align': 'left', 'sortable': True},
+            {'name': 'host', 'label': 'Host', 'field': 'host', 'align': 'left', 'sortable': True},
+            {'name': 'count', 'label': 'Count', 'field': 'count', 'sortable': True},
+            {'name': 'failed', 'label': 'Failed', 'field': 'failed', 'sortable': True},
+            {'name': 'mean', 'label': 'Mean [s]', 'field': 'mean', 'sortable': True},
+            {'name': 'max', 'label': 'Max [s]', 'field': 'max', 'sortable': True},
+            {'name': 'bytes', 'label': 'Transferred', 'field': 'bytes', 'sortable': True},
+            ]
+        with ui.expansion('Operation Statistics', icon='query_stats').classes('w-full') as self.expansion:
+            self.table = ui.table(columns=columns, rows=[], row_key='key').classes('w-full')
+            self.table._props['dense'] = True
+            self.table.add_slot('body-cell-bytes', r'''
+                <q-td :props="props">{{ props.row.transferred }}</q-td>
+            ''')
+        self.timer = ui.timer(interval, self.refresh)
+
+    def refresh(self) -> None:
+        if not self.expansion.value:
+            return
+        self.table.rows = [
+            dict(row, key=f"{row['operation']}:{row['repo']}:{row['host']}", mean=round(row['mean'], 3), max=round(row['max'], 3),
+                 transferred=_format_bytes(row['bytes']))
+            for row in operationMetrics.summary()]
+        self.table.update()
@@ -0,0 +1,279 @@
+from nicegui import background_tasks, run
+from nicegui.client import Client
+from abc import ABC, abstractmethod
+import asyncio
+import os
+
+from discovery import repoDiscovery
+from log_viewer import logFile
+from profiler import refreshProfiler
+from refresh_scheduler import refresh_scheduler
+from repo_watcher import repo_watcher
+from status_snapshot import status_snapshot, checked_at
+
+
+# Time in seconds between two checks for repositories which are due for a refresh
+SCHEDULER_TICK = 5.0
+
+
+class status_engine(ABC):
+    def __init__(self, name: str, label: str) -> None:
+        """Process wide owner of the repository list, refresh schedule and last status of one table
+
+        Tables of all browser sessions subscribe to the engine and receive pushed row updates,
+        so periodic refreshes and file watching run once, independent of the number of open sessions.
+        Periodic refreshes only check repositories which are due (see refresh_scheduler).
+        Subclasses implement init_repo_row, refresh and refresh_local_status.
+
+        :param name: Name of the table (used for the status snapshot file).
+        :param label: Name of the table shown in log messages.
+        """
+        self.name = name
+        self.label = label
+        self.repos = []
+        self.rows = {}
+        self.autoUpdate = False
+        self.autoUpdateTime = 900.0
+        self.watcher = repo_watcher(self.refresh_local_status,
+                                    on_error=lambda e: self.log(f"Refresh of changed {self.label} repositories failed: {e!r}", True))
+        self.snapshot = status_snapshot(name)
+        self.scheduler = refresh_scheduler(self.autoUpdateTime)
+        self._subscribers = []
+        self._timer = None
+        self._sweep = None
+        self._settings = None
+        self._refreshing = {}
+        self._discovery = None
+
+    def subscribe(self, subscriber, client: Client) -> None:
+        """Register a table, it receives all rows now and all row updates and log messages later
+
+        :param subscriber: Table with methods set_rows(rows), update_rows(results) and log_message(message, warning).
+        :param client: Client of the table, the subscription ends when the client is deleted.
+        """
+        self.unsubscribe(subscriber)
+        self._subscribers.append((subscriber, client))
+        subscriber.set_rows(self.get_rows())
+
+    def unsubscribe(self, subscriber) -> None:
+        self._subscribers = [(s, c) for s, c in self._subscribers if s is not subscriber]
+
+    def __subscribers(self) -> list:
+        self._subscribers = [(s, c) for s, c in self._subscribers if c.id in Client.instances]
+        return [s for s, _ in self._subscribers]
+
+    def get_rows(self) -> list:
+        # Every subscriber gets its own copies to detect changes per client
+        return [dict(row) for row in self.rows.values()]
+
+    def publish(self, results: list) -> None:
+        """Update cached rows and push the (partial) rows to all subscribers"""
+        for result in results:
+            if result['Path'] in self.rows:
+                self.rows[result['Path']].update(result)
+        for subscriber in self.__subscribers():
+            subscriber.update_rows(results)
+
+    def log(self, message: str, warning: bool = False) -> None:
+        logFile.write('Warning' if warning else 'Info', message)
+        for subscriber in self.__subscribers():
+            subscriber.log_message(message, warning)
+
+    def set_busy(self, repos: list) -> None:
+        self.publish([{'Path': r['Path'], 'busy': True} for r in repos])
+
+    def finish(self, results: list) -> None:
+        # Rows with current status from remote and local working copy, a failed check keeps
+        # the row stale with the time of its last successful check
+        checkedAt = checked_at()
+        self.publish([dict(result, busy=False, stale=True) if self.is_failure(result)
+                      else dict(result, busy=False, stale=False, checkedAt=checkedAt) for result in results])
+        for result in results:
+            self.scheduler.record(self.rows.get(result['Path'], result), self.is_failure(result))
+
+    def is_failure(self, result: dict) -> bool:
+        # Failed status requests only return the error message in 'status'
+        return 'remoteStatus' not in result
+
+    def save_snapshot(self) -> None:
+        try:
+            self.snapshot.save(list(self.rows.values()))
+        except OSError as e:
+            self.log(f"Failed to save {self.label} status snapshot {self.snapshot.filePath}: {e}", True)
+
+    @abstractmethod
+    def init_repo_row(self, r: dict) -> dict:
+        """Row of a repository without known status"""
+
+    @abstractmethod
+    async def refresh(self, repos: list):
+        """Refresh status of given repos, yields each result as soon as it is available"""
+
+    @abstractmethod
+    async def refresh_local_status(self, repoPaths: list) -> None:
+        """Refresh and publish local status of given repos, without remote access"""
+
+    async def refresh_cycle(self, repos: list):
+        """Refresh given repos as one cycle, yields each result as soon as it is available
+
+        Repositories which are refreshed right now (by a sweep or another session) are not refreshed
+        again, the running refresh is joined. The cycle runs to its end even if the caller stops
+        early, other callers may wait for its results.
+        """
+        loop = asyncio.get_running_loop()
+        running = [self._refreshing[r['Path']] for r in repos if r['Path'] in self._refreshing]
+        repos = [r for r in repos if r['Path'] not in self._refreshing]
+        started = {r['Path']: loop.create_future() for r in repos}
+        self._refreshing.update(started)
+        if repos:
+            background_tasks.create(self.__refresh_cycle(repos, started), name=f'{self.name}_refresh')
+        for future in asyncio.as_completed(running + list(started.values())):
+            result = await future
+            if result is not None:
+                yield result
+
+    async def __refresh_cycle(self, repos: list, started: dict) -> None:
+        # Profiled if profiling is active (see refresh_profiler), a repository without result resolves to None
+        try:
+            async with refreshProfiler.cycle(self.name, self.log):
+                results = self.refresh(repos)
+                try:
+                    async for result in results:
+                        future = started.get(result['Path'])
+                        if future is not None and not future.done():
+                            future.set_result(result)
+                finally:
+                    # Closed now and not by the garbage collector, so the profiled cycle ends here
+                    await results.aclose()
+        except Exception as e:
+            self.log(f"Update of {self.label} repositories failed: {e!r}", True)
+            failed = [r for r in repos if not started[r['Path']].done()]
+            self.publish([{'Path': r['Path'], 'busy': False} for r in failed])
+            for r in failed:
+                self.scheduler.record(self.rows.get(r['Path'], r), failed=True)
+        finally:
+            for repoPath, future in started.items():
+                if not future.done():
+                    future.set_result(None)
+                if self._refreshing.get(repoPath) is future:
+                    del self._refreshing[repoPath]
+
+    def configure(self, tableData: dict, refresh: bool = True) -> None:
+        """Apply table configuration, a changed repository list replaces all rows
+
+        :param tableData: Table section of the config file.
+        :param refresh: Start a sweep in background if the repository list changed.
+        """
+        # The auto update switch is shared by all sessions, the config file only sets it when its values changed
+        settings = (tableData.get('AutoUpdate'), tableData.get('AutoUpdateTime'))
+        if settings != self._settings:
+            self._settings = settings
+            self.autoUpdateTime = tableData.get('AutoUpdateTime', self.autoUpdateTime)
+            self.autoUpdate = tableData.get('AutoUpdate', self.autoUpdate)
+        if self._timer is None:
+            self._timer = background_tasks.create(self.__periodic_refresh(), name=f'{self.name}_refresh_timer')
+
+        repos = tableData.get('repo', [])
+        reposChanged = repos != self.repos
+        self.scheduler.configure(repos, self.autoUpdateTime, tableData.get('AutoUpdateMaxTime'))
+        if reposChanged:
+            self.repos = list(repos)
+            self.rows = {row['Path']: row for row in self.__initial_rows(self.repos)}
+            for row in self.rows.values():
+                self.scheduler.remember(row)
+            for subscriber in self.__subscribers():
+                subscriber.set_rows(self.get_rows())
+            if refresh:
+                background_tasks.create(self.sweep(), name=f'{self.name}_sweep')
+
+        if not tableData.get('AutoWatch', False):
+            self.watcher.stop()
+        elif reposChanged or not self.watcher.active:
+            self.watcher.watch([r['Path'] for r in self.repos])
+
+    async def discover(self, tableData: dict) -> dict:
+        """Add working copies found below DiscoverRoots to the repositories of the table configuration
+
+        Configured repositories take precedence over discovered ones with the same path.
+
+        :param tableData: Table section of the config file (DiscoverRoots, DiscoverExcludes).
+        :return: Table configuration with all repositories.
+        """
+        roots = tableData.get('DiscoverRoots', [])
+        if not roots:
+            return tableData
+        discovered, skipped = await run.io_bound(repoDiscovery.discover, self.name, roots, tableData.get('DiscoverExcludes', []))
+        for message in skipped:
+            self.log(message, True)
+        repos = list(tableData.get('repo', []))
+        configured = {os.path.normcase(os.path.normpath(r['Path'])) for r in repos}
+        added = [r for r in discovered if os.path.normcase(os.path.normpath(r['Path'])) not in configured]
+        self.log(f"{len(added)} {self.label} repositories discovered.")
+        return dict(tableData, repo=repos + added)
+
+    async def load(self, tableData: dict, refresh: bool = True, rescan: bool = False) -> None:
+        """Discover repositories and apply table configuration (see discover and configure)
+
+        Repositories are discovered once per table configuration, page loads of further sessions
+        reuse (or wait for) the last discovery.
+
+        :param tableData: Table section of the config file.
+        :param refresh: Start a sweep in background if the repository list changed.
+        :param rescan: Discover repositories even if the table configuration did not change.
+        """
+        if rescan or self._discovery is None or self._discovery[0] != tableData or self.__discovery_failed():
+            self._discovery = (tableData, asyncio.ensure_future(self.discover(tableData)))
+        self.configure(await asyncio.shield(self._discovery[1]), refresh)
+
+    def __discovery_failed(self) -> bool:
+        task = self._discovery[1]
+        return task.done() and (task.cancelled() or task.exception() is not None)
+
+    def clear(self) -> None:
+        """Remove all repositories and stop periodic sweeps and file watching"""
+        self.autoUpdate = False
+        self._settings = None
+        self._discovery = None
+        self.watcher.stop()
+        self.repos = []
+        self.rows = {}
+        for subscriber in self.__subscribers():
+            subscriber.set_rows([])
+
+    def __initial_rows(self, repos: list) -> list:
+        # Last known status from snapshot, configuration fields from config file
+        snapshot = self.snapshot.load()
+        rows = []
+        for r in repos:
+            if r['Path'] in snapshot:
+                rows.append(dict(snapshot[r['Path']], **r))
+            else:
+                rows.append(self.init_repo_row(r))
+        return rows
+
+    async def sweep(self) -> None:
+        """Refresh all repositories, a sweep requested while another one is running joins the running one"""
+        if self._sweep is not None and not self._sweep.done():
+            await asyncio.shield(self._sweep)
+            return
+        self._sweep = asyncio.ensure_future(self.__sweep())
+        await asyncio.shield(self._sweep)
+
+    async def __sweep(self) -> None:
+        self.log(f"Update {self.label} repository table...")
+        async for _ in self.refresh_cycle(self.repos):
+            pass
+        self.log("...done!")
+
+    async def __periodic_refresh(self) -> None:
+        while True:
+            await asyncio.sleep(SCHEDULER_TICK)
+            if not self.autoUpdate or (self._sweep is not None and not self._sweep.done()):
+                continue
+            duePaths = set(self.scheduler.due())
+            # Repositories refreshed by a user action right now are skipped
+            repos = [r for r in self.repos if r['Path'] in duePaths and not self.rows[r['Path']].get('busy')]
+            if not repos:
+                continue
+            async for _ in self.refresh_cycle(repos):
+                pass
@@ -0,0 +1,47 @@
+from datetime import datetime
+from pathlib import Path
+import json
+import os
+
+
+# Snapshots are local to the machine, the config file may be shared
+SNAPSHOT_DIR = Path(os.getenv('LOCALAPPDATA', Path.home())).joinpath('LocalRepoViewer')
+
+# Row fields which are only valid while the application is running
+TRANSIENT_FIELDS = {'busy', 'stale', 'progress', 'timedOut'}
+
+
+def checked_at() -> str:
+    """Time of a successful status check, as stored in the 'checkedAt' field of a row"""
+    return datetime.now().strftime('%Y-%m-%d %X')
+
+
+class status_snapshot():
+    def __init__(self, name: str, directory: Path = SNAPSHOT_DIR) -> None:
+        """Last known status of all repositories of a table, stored as json file
+
+        :param name: Name of the table, used as file name.
+        :param directory: Directory of the snapshot file.
+        """
+        self.filePath = Path(directory).joinpath(f'{name}_status.json')
+
+    def load(self) -> dict:
+        """Load last known rows keyed by Path, each row is marked as stale"""
+        try:
+            with open(self.filePath, mode='r', encoding='utf-8') as f:
+                rows = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return {row['Path']: dict(row, stale=True) for row in rows}
+
+    def save(self, rows: list) -> None:
+        """Save rows with the time of their last successful check ('checkedAt')
+
+        :raises OSError: If the snapshot file can not be written, the last saved snapshot is kept.
+        """
+        snapshotRows = [{field: value for field, value in row.items() if field not in TRANSIENT_FIELDS} for row in rows]
+        self.filePath.parent.mkdir(parents=True, exist_ok=True)
+        tempFile = self.filePath.with_suffix('.tmp')
+        with open(tempFile, mode='w', encoding='utf-8') as f:
+            json.dump(snapshotRows, f, indent=1)
+        os.replace(tempFile, self.filePath)
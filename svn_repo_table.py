@@ -1,18 +1,63 @@
 from nicegui import ui, run, background_tasks
 from pathlib import Path
 import asyncio
+import os
+import time
 
 from CM.Svn import ExtendedSvnRepo as SvnRepo
 
 from system_helpers import copy2clipboard
 from log_viewer import log_viewer
+from row_index import row_index
+from status_engine import status_engine
+from governor import resourceGovernor
+from metrics import operationMetrics
 
 
-def svn_repo_status(repo: SvnRepo) -> str:
+# Maximum number of repositories queried at the same time (each one in a worker process)
+SVN_CONCURRENCY = os.cpu_count() or 1
+
+# Time in seconds after which a repository is reported as not responding
+SVN_STATUS_TIMEOUT = 60.0
+
+# Minimum time in seconds between two progress reports of one working copy
+SVN_PROGRESS_INTERVAL = 0.5
+
+_semaphore = None
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    # Created lazily, the semaphore must belong to the running event loop
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(SVN_CONCURRENCY)
+    return _semaphore
+
+
+async def run_svn_call(func, *args):
+    """Run a svn call in a worker process, raises asyncio.TimeoutError after SVN_STATUS_TIMEOUT seconds
+
+    A worker process can not be stopped. A timed out call keeps its slot until the worker is done,
+    so no further calls are queued behind a busy worker.
+    """
+    await _get_semaphore().acquire()
+    future = asyncio.ensure_future(run.cpu_bound(func, *args))
+    future.add_done_callback(_release_worker)
+    return await asyncio.wait_for(asyncio.shield(future), SVN_STATUS_TIMEOUT)
+
+
+def _release_worker(future: asyncio.Future) -> None:
+    if not future.cancelled():
+        # Errors are reported to the caller, unless it timed out
+        future.exception()
+    _get_semaphore().release()
+
+
+def svn_repo_status(snapshot: dict) -> str:
     
-    if repo.getLocalLastChangeRevision() < repo.getRemoteLastChangeRevision():
+    if snapshot['localLastChangeRevision'] < snapshot['remoteLastChangeRevision']:
         repoStatus = "Update required"
-    elif repo.getLocalLastChangeRevision() > repo.getRemoteLastChangeRevision():
+    elif snapshot['localLastChangeRevision'] > snapshot['remoteLastChangeRevision']:
         repoStatus = 'Commit your data'
     else:
         repoStatus = "Up-to-Date"
@@ -20,25 +65,32 @@ def svn_repo_status(repo: SvnRepo) -> str:
     return repoStatus
 
 
-def get_repo_status(r: dict) -> dict:
-    print(f"SVN: {r['Path']} started!")
+def repo_folder_url(r: dict) -> str:
+    return '/'.join([r['ServerUrl'], r['RepoDir']])
+
+
+def get_youngest_revision(r: dict) -> int:
+    repo = SvnRepo(r['Path'], r['Path'], r['ServerUrl'], repo_folder_url(r), '<winauth>', '')
+    return repo.getRemoteYoungestRevision()
+
+
+def get_repo_status(r: dict, remoteRevision: int = None) -> dict:
     if Path(r['Path']).is_dir() and Path(r['Path']).joinpath('.svn').is_dir():
-        repo = SvnRepo(r['Path'], r['Path'], r['ServerUrl'], '/'.join([r['ServerUrl'], r['RepoDir']]), '<winauth>', '')
-        print(f"SVN: {r['Path']} repo object is initialized!")
-        repoStatus = svn_repo_status(repo)
-        print(f"SVN: {r['Path']} return result!")
+        repo = SvnRepo(r['Path'], r['Path'], r['ServerUrl'], repo_folder_url(r), '<winauth>', '')
+        snapshot = repo.getStatusSnapshot(remoteLastChangeRevision=remoteRevision)
         return {
             'Path': r['Path'],
             'ServerUrl': r['ServerUrl'],
             'RepoDir': r['RepoDir'],
-            'Revision': repo.getLocalLastChangeRevision(),
-            'status': '\n'.join(repo.getStatus()),
-            'localStatus': repo.is_dirty(untracked_files=True),
-            'remoteStatus': repoStatus,
-            'isRepo': True
+            'Revision': str(snapshot['localLastChangeRevision']),
+            'RemoteRevision': str(snapshot['remoteLastChangeRevision']),
+            'status': '\n'.join(snapshot['entries']),
+            'localStatus': snapshot['isDirty'],
+            'remoteStatus': svn_repo_status(snapshot),
+            'isRepo': True,
+            'timedOut': False
             }
     else:
-        print(f"SVN: {r['Path']} return result!")
         return {
             'Path': r['Path'],
             'ServerUrl': r['ServerUrl'],
@@ -47,46 +99,193 @@ def get_repo_status(r: dict) -> dict:
             'status': "",
             'localStatus': True,
             'remoteStatus': "",
-            'isRepo': False
+            'isRepo': False,
+            'timedOut': False
             }
     
 
-def get_multiple_repos_status(repos: list) -> list:
-    repo_status = []
-    for repo in repos:
-        repo_status.append(get_repo_status(repo))
-    
-    return repo_status
+def get_repo_local_status(r: dict) -> dict:
+    if Path(r['Path']).is_dir() and Path(r['Path']).joinpath('.svn').is_dir():
+        repo = SvnRepo(r['Path'], r['Path'], r['ServerUrl'], '/'.join([r['ServerUrl'], r['RepoDir']]), '<winauth>', '')
+        status = repo.getStatus()
+        return {
+            'Path': r['Path'],
+            'Revision': repo.getLocalLastChangeRevision(),
+            'status': '\n'.join(status),
+            'localStatus': bool(status),
+            'isRepo': True
+            }
+    else:
+        return {
+            'Path': r['Path'],
+            'Revision': "",
+            'status': "",
+            'localStatus': True,
+            'isRepo': False
+            }
+
 
+def get_multiple_repos_local_status(repos: list) -> list:
+    return [get_repo_local_status(repo) for repo in repos]
 
-def update_repo(r: dict) -> list:
+
+def init_repo_row(r: dict) -> dict:
+    # Row without status, shown until the first status is available
+    return {
+        'Path': r['Path'],
+        'ServerUrl': r['ServerUrl'],
+        'RepoDir': r['RepoDir'],
+        'Revision': "",
+        'status': "",
+        'localStatus': None,
+        'remoteStatus': "",
+        'isRepo': Path(r['Path']).joinpath('.svn').is_dir(),
+        'timedOut': False
+        }
+
+
+async def collect_youngest_revision(r: dict) -> int:
+    """Youngest revision of the server of a working copy, raises if it is not available"""
+    async with resourceGovernor.network(r['ServerUrl']), operationMetrics.measure('info', r['Path'], r['ServerUrl']):
+        return await run_svn_call(get_youngest_revision, r)
+
+
+async def collect_repo_status(r: dict, remoteRevision: int = None) -> dict:
+    if remoteRevision is not None:
+        # Remote revision is known, only the working copy is read
+        return await _collect_repo_status(r, remoteRevision)
+    async with resourceGovernor.network(r['ServerUrl']):
+        return await _collect_repo_status(r, remoteRevision)
+
+
+async def _collect_repo_status(r: dict, remoteRevision: int) -> dict:
     try:
-        repo = SvnRepo(r['Path'], r['Path'], r['ServerUrl'], '/'.join([r['ServerUrl'], r['RepoDir']]), '<winauth>', '')
-        result = repo.update()
+        async with operationMetrics.measure('status', r['Path'], r['ServerUrl']):
+            return await run_svn_call(get_repo_status, r, remoteRevision)
+    except asyncio.TimeoutError:
+        # Last known status is kept, the row is marked as timed out
+        return {
+            'Path': r['Path'],
+            'timedOut': True
+            }
+    except Exception as e:
+        return {
+            'Path': r['Path'],
+            'status': f"Failed to get status: {e!r}"
+            }
+
+
+async def stream_repo_status(repos: list, remoteRevisions: dict = {}):
+    # Yield results in order of completion, a slow repo does not block the others
+    coroutines = [collect_repo_status(r, remoteRevisions.get(repo_folder_url(r))) for r in repos]
+    for future in asyncio.as_completed(coroutines):
+        yield await future
+
+
+def update_repo(r: dict, progress=None, stats: dict = None) -> dict:
+    try:
+        repo = SvnRepo(r['Path'], r['Path'], r['ServerUrl'], repo_folder_url(r), '<winauth>', '')
+        revision = repo.updateWithProgress(progress, stats)
         return {
             'Path': r['Path'], 
             'Error': False, 
-            'Message': result}
+            'Message': f"Updated to revision {revision}."}
     except Exception as e:
-        if result:
-            return {
-                'Path': r['Path'], 
-                'Error': True, 
-                'Message': result}
-        else:
-            return {
-                'Path': r['Path'], 
-                'Error': True, 
-                'Message': str(e)}
+        return {
+            'Path': r['Path'], 
+            'Error': True, 
+            'Message': str(e)}
 
 
-def update_multiple_repos(repos: list) -> list:
-    results = []
-    # Iteration over given repos
-    for repo in repos:
-        results.append(update_repo(repo))
-    
-    return results
+async def run_update(r: dict, progress=None) -> dict:
+    # Updates run in threads (not processes), so progress can be reported while files are received
+    async with resourceGovernor.network(r['ServerUrl']), resourceGovernor.disk(r['Path']), \
+            operationMetrics.measure('update', r['Path'], r['ServerUrl']) as sample:
+        result = await run.io_bound(update_repo, r, progress, sample)
+        if result['Error']:
+            sample['outcome'] = 'error'
+        return result
+
+
+class svn_status_engine(status_engine):
+    def __init__(self) -> None:
+        """Status engine of the svn repository table, shared by all browser sessions
+
+        The youngest revision of each server is requested once per sweep. If it did not change
+        since the last sweep, the last change revisions of all its folders are still valid.
+        """
+        super().__init__('svn', 'Svn')
+        self._youngestRevisions = {}
+        self._folderRevisions = {}
+
+    async def __known_remote_revisions(self, repos: list) -> dict:
+        servers = {r['ServerUrl']: r for r in repos if Path(r['Path']).joinpath('.svn').is_dir()}
+        youngestRevisions = await asyncio.gather(*[collect_youngest_revision(r) for r in servers.values()],
+                                                 return_exceptions=True)
+        knownRevisions = {}
+        for serverUrl, youngestRevision in zip(servers, youngestRevisions):
+            if isinstance(youngestRevision, Exception):
+                # Folders are queried one by one
+                self.log(f"Youngest revision of {serverUrl} not available: {youngestRevision!r}", True)
+                continue
+            if youngestRevision == self._youngestRevisions.get(serverUrl):
+                knownRevisions.update(self._folderRevisions.get(serverUrl, {}))
+            else:
+                self._folderRevisions[serverUrl] = {}
+            self._youngestRevisions[serverUrl] = youngestRevision
+        return knownRevisions
+
+    def __remember_remote_revision(self, r: dict, result: dict) -> None:
+        if result.get('RemoteRevision') and r['ServerUrl'] in self._folderRevisions:
+            self._folderRevisions[r['ServerUrl']][repo_folder_url(r)] = int(result['RemoteRevision'])
+
+    async def __stream_repo_status(self, repos: list):
+        repoByPath = {r['Path']: r for r in repos}
+        async for result in stream_repo_status(repos, await self.__known_remote_revisions(repos)):
+            self.__remember_remote_revision(repoByPath[result['Path']], result)
+            yield result
+
+    def init_repo_row(self, r: dict) -> dict:
+        return init_repo_row(r)
+
+    async def refresh(self, repos: list):
+        self.set_busy(repos)
+        async for result in self.__stream_repo_status(repos):
+            self.finish([result])
+            yield result
+        self.save_snapshot()
+
+    async def refresh_local_status(self, repoPaths: list) -> None:
+        repos = [self.rows[repoPath] for repoPath in repoPaths if repoPath in self.rows]
+        self.publish(await run.io_bound(get_multiple_repos_local_status, repos))
+
+    def __progress_reporter(self, repoPath: str):
+        # Called from the update thread, rows are updated in the event loop
+        loop = asyncio.get_running_loop()
+        lastReport = 0.0
+
+        def report(receivedItems: int, path: str) -> None:
+            nonlocal lastReport
+            now = time.monotonic()
+            if now - lastReport >= SVN_PROGRESS_INTERVAL:
+                lastReport = now
+                loop.call_soon_threadsafe(self.publish, [{'Path': repoPath, 'progress': f'{receivedItems} items received'}])
+        return report
+
+    async def __update_and_get_status(self, r: dict) -> tuple:
+        result = await run_update(r, self.__progress_reporter(r['Path']))
+        return result, await collect_repo_status(r)
+
+    async def update(self, repos: list):
+        self.set_busy(repos)
+        for future in asyncio.as_completed([self.__update_and_get_status(r) for r in repos]):
+            result, status = await future
+            self.finish([dict(status, progress='')])
+            yield result
+        self.save_snapshot()
+
+
+svnStatusEngine = svn_status_engine()
 
 
 class svn_repo_table():
@@ -99,8 +298,9 @@ class svn_repo_table():
             self.table._props['columns'] = [column for column in self._columnDefs if column['name'] in self._visibleColumns]
             self.table._props['virtual-scroll'] = False #! If true, column widths change with scrolling
             self.table._props['wrap-cells'] = True
-
-            self.timer = ui.timer(900.0, lambda: background_tasks.create(self.__periodic_update_table(self.table.rows)), active=False)
+            # Time of the last check alone does not make a row change, it is shown with stale rows
+            self._rows = row_index(self.table, passiveFields={'checkedAt'})
+            self.engine = svnStatusEngine
 
             with self.table.add_slot('top-left'):
                 ui.label('Svn Repositories').classes('text-h5 font-bold text-primary')
@@ -109,7 +309,7 @@ class svn_repo_table():
                     ui.tooltip('Update local repositories and refresh table')
                 with ui.button('Refresh', on_click=lambda: self.update_table(self.table.rows), color='primary', icon='refresh').props('flat'):
                     ui.tooltip('Refresh table')
-                with ui.switch(value=False).bind_value(self.timer, 'active').props('icon="autorenew"'):
+                with ui.switch(value=False).bind_value(self.engine, 'autoUpdate').props('icon="autorenew"'):
                     ui.tooltip('Refresh table periodic')
                 
 
@@ -150,6 +350,14 @@ class svn_repo_table():
                         </q-icon>
                     </q-td>
                     <q-td key="remoteStatus" :props="props" v-if="props.row.isRepo==true">
+                        <q-spinner color="primary" v-if="props.row.busy" size="sm" />
+                        <span class="text-grey" v-if="props.row.busy && props.row.progress">{{ props.row.progress }}</span>
+                        <q-icon name="history" color="grey" v-if="props.row.stale" size="sm">
+                            <q-tooltip>Last known status from {{ props.row.checkedAt }}</q-tooltip>
+                        </q-icon>
+                        <q-icon name="timer_off" color="negative" v-if="props.row.timedOut" size="sm">
+                            <q-tooltip>Svn status timed out, last known status is shown!</q-tooltip>
+                        </q-icon>
                         {{ props.row.remoteStatus }}
                         <q-icon name="check_circle" color="green" v-if="props.row.remoteStatus=='Up-to-Date'" size="sm">
                             <q-tooltip>Local repo is up-to-date!</q-tooltip>
@@ -310,54 +518,47 @@ class svn_repo_table():
 
 
     def init_data(self, tableData: dict) -> None:
-        # Fetch given repos
+        # Show rows of the shared status engine, a new repository list is collected in background
         self._log.info_message("Initialize Svn repository table...")
+        self.engine.subscribe(self, self.table.client)
+        if tableData.get('DiscoverRoots'):
+            # Discovered repositories are shown when the scan is done, the scan of an unchanged configuration is reused
+            background_tasks.create(self.engine.load(tableData), name='svn_discovery')
+        else:
+            self.engine.configure(tableData)
 
-        # Update table
-        results = get_multiple_repos_status(tableData['repo'])
-        self.table.update_rows(results)
-        
-        # Set timer
-        if 'AutoUpdateTime' in tableData.keys():
-            self.timer.interval = tableData['AutoUpdateTime']
-        if 'AutoUpdate' in tableData.keys():
-            if tableData['AutoUpdate']:
-                self.timer.activate()
-            else:
-                self.timer.deactivate()
-        
-        self._log.info_message("...done!")
 
+    async def reload(self, tableData: dict) -> None:
+        self.engine.subscribe(self, self.table.client)
+        await self.engine.load(tableData, refresh=False, rescan=True)
+        await self.update_table(self.engine.repos)
 
-    async def __periodic_update_table(self, repos: list = []) -> None:
-        self._log.info_message("Update Svn repository table...")
-        results = await run.cpu_bound(get_multiple_repos_status, repos)
-        self.__update_rows(results)
-        self._log.info_message("...done!")
-        
 
-    def __update_rows(self, results: list = []) -> None:
-        for result in results:
-            for row in self.table.rows:
-                if row['Path'] == result['Path']:
-                    row.update(result)
-    
-        self.table.update()
+    def set_rows(self, rows: list) -> None:
+        self._rows.set_rows(rows)
+
+
+    def update_rows(self, results: list) -> None:
+        self._rows.update(results)
 
 
-    async def update_table(self, repos: list = [], fullList: bool = False) -> None:
+    def log_message(self, message: str, warning: bool = False) -> None:
+        # Messages of the engine are written to the log file by the engine
+        if warning:
+            self._log.warning_message(message, toFile=False)
+        else:
+            self._log.info_message(message, toFile=False)
+
+
+    async def update_table(self, repos: list = []) -> None:
         self._log.info_message("Update Svn repository table...")
-        for repo in [r['Path'] for r in repos]:
-            self._log.info_message(f"   ....{repo}")
         n = ui.notification(message='Get Svn repo status!', spinner=True, timeout=None, color='primary')
         await asyncio.sleep(0.1)
-        results = await run.cpu_bound(get_multiple_repos_status, repos)
-        n.message = 'Update Svn table!'
-        await asyncio.sleep(0.5)
-        if fullList:
-            self.table.update_rows(results)
-        else:
-            self.__update_rows(results)
+        finished = 0
+        async for result in self.engine.refresh_cycle(repos):
+            finished += 1
+            self._log.info_message(f"   ....{result['Path']}", result['Path'])
+            n.message = f'Update Svn table! ({finished}/{len(repos)})'
         n.message = 'Done!'
         n.spinner = False
         await asyncio.sleep(0.5)
@@ -367,19 +568,17 @@ class svn_repo_table():
 
     async def _update_repos(self, repos: list = []) -> None:
         self._log.info_message("Update Svn repositories...")
+        repos = [r for r in repos if r['isRepo']]
         n = ui.notification(message='Update from remote', spinner=True, timeout=None, color='primary')
         await asyncio.sleep(0.1)
-        results = await run.io_bound(update_multiple_repos, [r for r in repos if r['isRepo']])
-        for result in results:
+        finished = 0
+        async for result in self.engine.update(repos):
+            finished += 1
             if result['Error']:
-                self._log.warning_message(f"{result['Path']}:\n{result['Message']}")
+                self._log.warning_message(f"{result['Path']}:\n{result['Message']}", result['Path'])
             else:
-                self._log.info_message(f"{result['Path']}:\n{result['Message']}")
-        n.message = 'Get Svn repo status!'
-        results = await run.cpu_bound(get_multiple_repos_status, repos)
-        n.message = 'Update Svn table!'
-        await asyncio.sleep(0.5)
-        self.__update_rows(results)
+                self._log.info_message(f"{result['Path']}:\n{result['Message']}", result['Path'])
+            n.message = f'Update Svn repositories! ({finished}/{len(repos)})'
         n.message = 'Done!'
         n.spinner = False
         await asyncio.sleep(1)
@@ -0,0 +1,40 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+# Modules of the application are top level modules of the repository
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+
+def run_git(path, *args: str, env: dict = None) -> str:
+    return subprocess.run(["git", "-C", str(path), *args], check=True, capture_output=True, encoding="utf-8",
+                          env=env).stdout
+
+
+@pytest.fixture
+def git_repo(tmp_path):
+    """Empty git repository in folder 'repo' of the test folder"""
+    repoPath = tmp_path.joinpath("repo")
+    subprocess.run(["git", "init", "-q", "-b", "main", str(repoPath)], check=True)
+    return repoPath
+
+
+@pytest.fixture
+def git_commit():
+    """Function which writes files (name -> content) to a repository and commits them, returns the commit sha
+
+    The optional date (e.g. '2024-01-01T10:00:00') is used as author and committer date.
+    """
+    def commit(repoPath, files: dict, message: str, date: str = None) -> str:
+        for name, content in files.items():
+            repoPath.joinpath(name).parent.mkdir(parents=True, exist_ok=True)
+            repoPath.joinpath(name).write_text(content, encoding="utf-8")
+        env = dict(os.environ, GIT_AUTHOR_DATE=date, GIT_COMMITTER_DATE=date) if date else None
+        run_git(repoPath, "add", "-A")
+        run_git(repoPath, "-c", "user.name=Test", "-c", "user.email=test@example.com", "commit", "-q", "-m", message,
+                env=env)
+        return run_git(repoPath, "rev-parse", "HEAD").strip()
+    return commit
@@ -0,0 +1,25 @@
+import pytest
+
+from CM.Backup import BUILD_OUTPUT_EXCLUDES, checkBackupComplete, createBackup
+
+
+def test_nothing_is_excluded_by_default(tmp_path):
+    tmp_path.joinpath("model.slxc").write_text("cache")
+    tmp_path.joinpath("script.m").write_text("code")
+    result = createBackup(tmp_path, ["model.slxc", "script.m"], tmp_path.joinpath("backup.zip"))
+    assert result["files"] == 2 and result["excluded"] == []
+    checkBackupComplete(result)
+
+
+def test_build_output_excludes_are_opt_in(tmp_path):
+    tmp_path.joinpath("model.slxc").write_text("cache")
+    result = createBackup(tmp_path, ["model.slxc"], tmp_path.joinpath("backup.zip"), excludes=BUILD_OUTPUT_EXCLUDES)
+    assert result["excluded"] == ["model.slxc"] and result["backupFile"] is None
+
+
+def test_skipped_files_make_backup_incomplete(tmp_path):
+    tmp_path.joinpath("big.bin").write_bytes(b"0" * 100)
+    result = createBackup(tmp_path, ["big.bin"], tmp_path.joinpath("backup.zip"), maxBytes=10)
+    assert result["skipped"] == ["big.bin"]
+    with pytest.raises(RuntimeError):
+        checkBackupComplete(result)
@@ -0,0 +1,53 @@
+import subprocess
+
+from CM.Git import ExtendedGitRepo, generateChangelogs
+
+
+def git_log(path):
+    return subprocess.run(["git", "-C", str(path), "log", "--no-merges",
+                           "--format=%s%n========%nAuthor: %aN%nCommit: %H%nDate:   %aD%n%n%b%n",
+                           "HEAD~3..HEAD"], check=True, capture_output=True, encoding="utf-8").stdout
+
+
+def test_changelog_is_text_like_git_log(tmp_path, git_repo, git_commit):
+    repoPath = git_repo
+    for i in range(4):
+        git_commit(repoPath, {f"{i}.txt": str(i)}, f"Change {i} ä")
+    logFilePath = tmp_path.joinpath("changelog.txt")
+    ExtendedGitRepo(str(repoPath)).generateChangelog(str(logFilePath), encoding="utf-8")
+    assert logFilePath.read_text(encoding="utf-8") == git_log(repoPath).removesuffix("\n")
+
+
+def test_incremental_changelog_equals_complete_one(tmp_path, git_repo, git_commit):
+    repoPath = git_repo
+    for i in range(2):
+        git_commit(repoPath, {f"{i}.txt": str(i)}, f"Change {i}")
+    logFilePath = tmp_path.joinpath("changelog.txt")
+    ExtendedGitRepo(str(repoPath)).generateChangelog(str(logFilePath), incremental=True)
+    for i in range(2, 4):
+        git_commit(repoPath, {f"{i}.txt": str(i)}, f"Change {i}")
+    ExtendedGitRepo(str(repoPath)).generateChangelog(str(logFilePath), incremental=True)
+    assert logFilePath.read_text() == git_log(repoPath).removesuffix("\n")
+
+
+def test_jobs_of_one_repository_run_one_after_another(tmp_path, git_repo, git_commit, monkeypatch):
+    for i in range(4):
+        git_commit(git_repo, {f"{i}.txt": str(i)}, f"Change {i}")
+    running = []
+    concurrent = set()
+    generateChangelog = ExtendedGitRepo.generateChangelog
+
+    def recording(self, *args):
+        running.append(1)
+        concurrent.add(len(running))
+        try:
+            return generateChangelog(self, *args)
+        finally:
+            running.pop()
+    monkeypatch.setattr(ExtendedGitRepo, "generateChangelog", recording)
+    jobs = [{"repoPath": str(git_repo), "logFilePath": str(tmp_path.joinpath(f"log{i}.txt"))} for i in range(4)]
+    jobs.append({"repoPath": str(git_repo) + "/", "logFilePath": str(tmp_path.joinpath("missing", "\0.txt"))})
+    results = generateChangelogs(jobs, maxWorkers=4)
+    assert concurrent == {1}
+    assert results[str(git_repo)] == "" and results[str(git_repo) + "/"] != ""
+    assert tmp_path.joinpath("log3.txt").read_text() == git_log(git_repo).removesuffix("\n")
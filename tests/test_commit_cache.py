@@ -0,0 +1,22 @@
+from CM.Git import CommitCache, ExtendedGitRepo
+
+
+def test_update_stores_new_entry(git_repo, git_commit):
+    git_commit(git_repo, {"a.txt": "a"}, "a")
+    repo = ExtendedGitRepo(str(git_repo))
+    cache = CommitCache()
+    entry = cache.get(repo)
+    cache.update(repo, entry["head"], rootCommit=entry["head"])
+    assert entry["rootCommit"] is None
+    assert cache.get(repo)["rootCommit"] == entry["head"]
+
+
+def test_update_of_old_head_is_dropped(git_repo, git_commit):
+    oldHead = git_commit(git_repo, {"a.txt": "a"}, "a")
+    repo = ExtendedGitRepo(str(git_repo))
+    cache = CommitCache()
+    assert cache.get(repo)["head"] == oldHead
+    git_commit(git_repo, {"b.txt": "b"}, "b")
+    newEntry = cache.get(repo)
+    cache.update(repo, oldHead, knownCommits=frozenset({"0" * 40}))
+    assert cache.get(repo)["knownCommits"] == newEntry["knownCommits"]
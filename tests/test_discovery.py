@@ -0,0 +1,55 @@
+import subprocess
+
+from discovery import exclude_matcher, git_repo_entry, repo_discovery
+
+
+def test_exclude_matcher_matches_path_and_name():
+    is_excluded = exclude_matcher(["node_modules", "*/build/*", "tmp*"])
+    assert is_excluded("C:\\work\\project\\node_modules")
+    assert is_excluded("/work/project/build/output")
+    assert is_excluded("/work/tmp_checkout")
+    assert not is_excluded("/work/project/src")
+    assert not exclude_matcher([])("/work/anything")
+
+
+def make_tree(tmp_path):
+    subprocess.run(["git", "init", "-q", "-b", "main", str(tmp_path.joinpath("a", "repo1"))], check=True)
+    subprocess.run(["git", "init", "-q", "-b", "dev", str(tmp_path.joinpath("b", "repo2"))], check=True)
+    # Nested repository below a working copy is not scanned
+    subprocess.run(["git", "init", "-q", str(tmp_path.joinpath("a", "repo1", "nested"))], check=True)
+    tmp_path.joinpath("c", "wc", ".svn").mkdir(parents=True)
+    tmp_path.joinpath("skip", "repo3", ".git").mkdir(parents=True)
+
+
+def test_scan_finds_working_copies(tmp_path):
+    make_tree(tmp_path)
+    found = repo_discovery().scan([str(tmp_path)], ["skip"])
+    assert found == {
+        "git": [tmp_path.joinpath("a", "repo1").as_posix(), tmp_path.joinpath("b", "repo2").as_posix()],
+        "svn": [tmp_path.joinpath("c", "wc").as_posix()],
+    }
+
+
+def test_rescan_sees_new_working_copies(tmp_path):
+    make_tree(tmp_path)
+    discovery = repo_discovery()
+    discovery.scan([str(tmp_path)])
+    subprocess.run(["git", "init", "-q", str(tmp_path.joinpath("b", "repo4"))], check=True)
+    assert tmp_path.joinpath("b", "repo4").as_posix() in discovery.scan([str(tmp_path)])["git"]
+
+
+def test_git_repo_entry(tmp_path):
+    make_tree(tmp_path)
+    repoPath = tmp_path.joinpath("b", "repo2")
+    subprocess.run(["git", "-C", str(repoPath), "remote", "add", "origin", "https://example.com/repo2.git"], check=True)
+    assert git_repo_entry(str(repoPath)) == {"Path": repoPath.as_posix(), "Url": "https://example.com/repo2.git",
+                                             "Branch": "dev"}
+
+
+def test_detached_head_is_skipped(tmp_path):
+    make_tree(tmp_path)
+    repoPath = tmp_path.joinpath("a", "repo1")
+    repoPath.joinpath(".git", "HEAD").write_text("0123456789abcdef0123456789abcdef01234567\n")
+    repos, skipped = repo_discovery().discover("git", [str(tmp_path)], ["skip"])
+    assert [r["Path"] for r in repos] == [tmp_path.joinpath("b", "repo2").as_posix()]
+    assert len(skipped) == 1 and "Detached HEAD" in skipped[0]
@@ -0,0 +1,56 @@
+import io
+import subprocess
+
+from CM.Git import ExtendedGitRepo, readNulSeparated
+
+
+def test_read_nul_separated_across_chunks():
+    stream = io.BytesIO("a\0b ä\0\ncd\0last".encode("utf-8"))
+    assert list(readNulSeparated(stream, chunkSize=3)) == ["a", "b ä", "\ncd", "last"]
+
+
+def test_last_commits_of_quoted_paths(git_repo, git_commit):
+    first = git_commit(git_repo, {"dir ä/file \"q\".txt": "1", "a.txt": "1"}, "first")
+    second = git_commit(git_repo, {"a.txt": "2"}, "second")
+    repo = ExtendedGitRepo(str(git_repo))
+    lastCommits = repo._findLastCommits({"dir ä/file \"q\".txt", "dir ä", "a.txt", ".", "missing.txt"})
+    assert lastCommits == {"dir ä/file \"q\".txt": first, "dir ä": first, "a.txt": second, ".": second,
+                           "missing.txt": ""}
+
+
+def test_tree_index_of_head(git_repo, git_commit):
+    git_commit(git_repo, {"dir ä/file \"q\".txt": "1", "a.txt": "1"}, "first")
+    repo = ExtendedGitRepo(str(git_repo))
+    expected = {}
+    for path in ["dir ä/file \"q\".txt", "dir ä", "a.txt"]:
+        expected[path] = subprocess.run(["git", "-C", str(git_repo), "rev-parse", f"HEAD:{path}"], check=True,
+                                        capture_output=True, encoding="utf-8").stdout.strip()
+    assert {path: sha.hex() for path, sha in repo._getTreeIndex().items()} == expected
+    assert repo.getFileShas([str(git_repo.joinpath("a.txt")), "missing.txt"]) == {
+        str(git_repo.joinpath("a.txt")): expected["a.txt"], "missing.txt": ""}
+
+
+def test_tree_index_follows_head(git_repo, git_commit):
+    git_commit(git_repo, {"a.txt": "1"}, "first")
+    repo = ExtendedGitRepo(str(git_repo))
+    assert set(repo._getTreeIndex()) == {"a.txt"}
+    git_commit(git_repo, {"b.txt": "1"}, "second")
+    assert set(repo._getTreeIndex()) == {"a.txt", "b.txt"}
+
+
+def test_discarded_side_branch_is_not_credited(git_repo, git_commit):
+    git_commit(git_repo, {"f": "1", "g": "1"}, "base", "2024-01-01T10:00:00")
+    mainCommit = git_commit(git_repo, {"f": "2"}, "main", "2024-01-01T11:00:00")
+    subprocess.run(["git", "-C", str(git_repo), "checkout", "-q", "-b", "side"], check=True)
+    # Side commit is newer than the last change of f on main
+    sideCommit = git_commit(git_repo, {"f": "3", "g": "3"}, "side", "2024-01-01T12:00:00")
+    subprocess.run(["git", "-C", str(git_repo), "checkout", "-q", "main"], check=True)
+    subprocess.run(["git", "-C", str(git_repo), "-c", "user.name=Test", "-c", "user.email=test@example.com",
+                    "merge", "-q", "-s", "ours", "-m", "merge", "side"], check=True)
+    # g is taken from the side branch by a later commit, f stays as it is on main
+    git_commit(git_repo, {"g": "3"}, "take g")
+    repo = ExtendedGitRepo(str(git_repo))
+    assert repo.getCommitShas(["f"]) == {"f": mainCommit}
+    expected = subprocess.run(["git", "-C", str(git_repo), "log", "-1", "--format=%H", "--", "f"], check=True,
+                              capture_output=True, encoding="utf-8").stdout.strip()
+    assert expected == mainCommit != sideCommit
@@ -0,0 +1,27 @@
+import asyncio
+import subprocess
+
+import git_repo_table
+
+
+def test_broken_working_copy_gets_failure_row(tmp_path):
+    tmp_path.joinpath('.git').mkdir()
+    r = {'Path': str(tmp_path), 'Url': 'https://example.com/repo.git', 'Branch': 'main'}
+    result = asyncio.run(git_repo_table.refresh_repo(r))
+    assert result['Path'] == str(tmp_path)
+    assert 'remoteStatus' not in result and result['status'].startswith('Failed')
+
+
+def test_pull_and_push_of_removed_folder_fail(tmp_path):
+    r = {'Path': str(tmp_path.joinpath('removed')), 'Url': 'https://example.com/repo.git', 'Branch': 'main'}
+    assert asyncio.run(git_repo_table.pull_repo(r))['Error']
+    assert asyncio.run(git_repo_table.push_repo(r))['Error']
+
+
+def test_failed_fetch_keeps_last_known_status(tmp_path):
+    subprocess.run(["git", "init", "-q", str(tmp_path)], check=True)
+    subprocess.run(["git", "-C", str(tmp_path), "remote", "add", "origin", str(tmp_path.joinpath("missing.git"))],
+                   check=True)
+    r = {'Path': str(tmp_path), 'Url': str(tmp_path.joinpath("missing.git")), 'Branch': 'main'}
+    result = asyncio.run(git_repo_table.refresh_repo(r))
+    assert 'remoteStatus' not in result and result['status'].startswith('Failed to fetch')
@@ -0,0 +1,50 @@
+from CM.Git import parseStatusPorcelainV2, parseRemoteHeads
+
+
+def test_clean_branch_with_upstream():
+    output = "\0".join([
+        "# branch.oid 1234567890abcdef1234567890abcdef12345678",
+        "# branch.head main",
+        "# branch.upstream origin/main",
+        "# branch.ab +0 -0",
+        ""])
+    status = parseStatusPorcelainV2(output)
+    assert status["commit"] == "1234567890abcdef1234567890abcdef12345678"
+    assert status["branch"] == "main"
+    assert status["upstream"] == "origin/main"
+    assert (status["ahead"], status["behind"]) == (0, 0)
+    assert status["entries"] == []
+    assert not status["isDirty"]
+
+
+def test_ahead_behind_and_entries():
+    output = "\0".join([
+        "# branch.oid abc",
+        "# branch.head feature",
+        "# branch.ab +2 -3",
+        "1 .M N... 100644 100644 100644 aaa bbb src/file name.py",
+        "2 R. N... 100644 100644 100644 aaa bbb R100 new.txt",
+        "old.txt",
+        "u UU N... 100644 100644 100644 100644 aaa bbb ccc conflict.txt",
+        "? untracked.txt",
+        ""])
+    status = parseStatusPorcelainV2(output)
+    assert (status["ahead"], status["behind"]) == (2, 3)
+    assert status["entries"] == [
+        " M src/file name.py",
+        "R  old.txt -> new.txt",
+        "UU conflict.txt",
+        "?? untracked.txt"]
+    assert status["isDirty"]
+
+
+def test_detached_head_without_upstream():
+    status = parseStatusPorcelainV2("# branch.oid abc\0# branch.head (detached)\0")
+    assert status["branch"] == "(detached)"
+    assert status["upstream"] == ""
+    assert (status["ahead"], status["behind"]) == (0, 0)
+
+
+def test_parse_remote_heads():
+    output = "aaa\trefs/heads/main\nbbb\trefs/heads/feature/x"
+    assert parseRemoteHeads(output) == {"main": "aaa", "feature/x": "bbb"}
@@ -0,0 +1,47 @@
+import asyncio
+import os
+
+import pytest
+
+from governor import disk_volume, remote_host, resource_governor
+
+
+@pytest.mark.parametrize("url, host", [
+    ("https://User@Git.Example.com:8443/group/repo.git", "git.example.com"),
+    ("ssh://git@example.com/repo.git", "example.com"),
+    ("git@example.com:group/repo.git", "example.com"),
+    ("example.com:repo.git", "example.com"),
+    ("svn://svn.example.com/repos", "svn.example.com"),
+    ("file:///srv/git/repo.git", "local"),
+    ("C:/repos/upstream.git", "local"),
+    ("/srv/git/repo.git", "local"),
+    ("../upstream.git", "local"),
+])
+def test_remote_host(url, host):
+    assert remote_host(url) == host
+
+
+def test_disk_volume_of_missing_path_is_volume_of_existing_parent(tmp_path):
+    assert disk_volume(str(tmp_path.joinpath("missing", "repo"))) == disk_volume(str(tmp_path))
+    if os.name != "nt":
+        assert disk_volume(str(tmp_path)) == str(os.stat(tmp_path).st_dev)
+
+
+def test_network_limit_per_host():
+    async def main():
+        governor = resource_governor(networkLimit=2)
+        running = 0
+        maxRunning = 0
+
+        async def operation(url):
+            nonlocal running, maxRunning
+            async with governor.network(url):
+                running += 1
+                maxRunning = max(maxRunning, running)
+                await asyncio.sleep(0.01)
+                running -= 1
+
+        await asyncio.gather(*[operation("https://example.com/repo.git") for _ in range(5)])
+        assert maxRunning == 2
+
+    asyncio.run(main())
@@ -0,0 +1,35 @@
+import asyncio
+
+from profiler import refresh_profiler
+
+
+def run_cycle(profiler, messages):
+    async def main():
+        async with profiler.cycle('git', lambda message, warning=False: messages.append((message, warning))) as path:
+            sum(range(1000))
+        return path
+
+    return asyncio.run(main())
+
+
+def test_profiled_cycle_is_saved(tmp_path):
+    profiler = refresh_profiler(tmp_path)
+    profiler.start(1)
+    messages = []
+    path = run_cycle(profiler, messages)
+    assert path.exists() and path.with_suffix('.txt').exists()
+    assert messages == [(f"Profile of git refresh saved to {path}", False)]
+    assert not profiler.active and profiler._profile is None
+    assert run_cycle(profiler, messages) is None
+
+
+def test_failed_save_is_logged(tmp_path):
+    directory = tmp_path.joinpath('profiles')
+    directory.write_text('not a folder')
+    profiler = refresh_profiler(directory)
+    profiler.start(2)
+    messages = []
+    run_cycle(profiler, messages)
+    assert len(messages) == 1 and messages[0][1]
+    assert profiler._profile is None
+    assert run_cycle(profiler, messages) is not None
@@ -0,0 +1,86 @@
+import pytest
+
+import refresh_scheduler as scheduler_module
+from refresh_scheduler import refresh_scheduler
+
+
+class fake_clock():
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = fake_clock()
+    monkeypatch.setattr(scheduler_module.time, 'monotonic', clock)
+    # No jitter, first checks after half of the interval
+    monkeypatch.setattr(scheduler_module.random, 'uniform', lambda a, b: (a + b) / 2)
+    return clock
+
+
+def next_check(scheduler, repoPath):
+    return scheduler._nextChecks[repoPath] - scheduler_module.time.monotonic()
+
+
+def test_first_checks_are_spread_over_interval(clock):
+    scheduler = refresh_scheduler()
+    scheduler.configure([{'Path': 'a'}], 100.0)
+    assert scheduler.due() == []
+    clock.now += 50.0
+    assert scheduler.due() == ['a']
+
+
+def test_dormant_repository_interval_doubles_up_to_max(clock):
+    scheduler = refresh_scheduler()
+    scheduler.configure([{'Path': 'a'}], 100.0, 300.0)
+    row = {'Path': 'a', 'remoteStatus': 'Up-to-Date'}
+    intervals = []
+    for _ in range(4):
+        scheduler.record(row)
+        intervals.append(next_check(scheduler, 'a'))
+    assert intervals == [100.0, 200.0, 300.0, 300.0]
+    scheduler.record(dict(row, remoteStatus='Pull required'))
+    assert next_check(scheduler, 'a') == 100.0
+
+
+def test_transient_fields_do_not_count_as_change(clock):
+    scheduler = refresh_scheduler()
+    scheduler.configure([{'Path': 'a'}], 100.0)
+    scheduler.record({'Path': 'a', 'remoteStatus': 'Up-to-Date', 'checkedAt': '1', 'busy': True})
+    scheduler.record({'Path': 'a', 'remoteStatus': 'Up-to-Date', 'checkedAt': '2', 'busy': False})
+    assert next_check(scheduler, 'a') == 200.0
+
+
+def test_failures_back_off(clock):
+    scheduler = refresh_scheduler()
+    scheduler.configure([{'Path': 'a'}], 100.0, 500.0)
+    intervals = []
+    for _ in range(4):
+        scheduler.record({'Path': 'a'}, failed=True)
+        intervals.append(next_check(scheduler, 'a'))
+    assert intervals == [200.0, 400.0, 500.0, 500.0]
+    scheduler.record({'Path': 'a', 'remoteStatus': 'Up-to-Date'})
+    assert next_check(scheduler, 'a') == 100.0
+
+
+def test_repository_interval_override(clock):
+    scheduler = refresh_scheduler()
+    scheduler.configure([{'Path': 'a', 'AutoUpdateTime': 30.0}, {'Path': 'b'}], 100.0)
+    row = {'Path': 'a', 'remoteStatus': 'Up-to-Date'}
+    scheduler.record(row)
+    scheduler.record(row)
+    assert next_check(scheduler, 'a') == 30.0
+    scheduler.record(row, failed=True)
+    assert next_check(scheduler, 'a') == 60.0
+
+
+def test_removed_repositories_are_forgotten(clock):
+    scheduler = refresh_scheduler()
+    scheduler.configure([{'Path': 'a'}, {'Path': 'b'}], 100.0)
+    scheduler.configure([{'Path': 'b'}], 100.0)
+    scheduler.record({'Path': 'a', 'remoteStatus': 'Up-to-Date'})
+    clock.now += 1000.0
+    assert scheduler.due() == ['b']
@@ -0,0 +1,38 @@
+import shutil
+import subprocess
+
+from CM.Git import GitRepoRegistry
+
+
+def init_repo(path):
+    subprocess.run(["git", "init", "-q", str(path)], check=True)
+
+
+def test_handle_survives_lock_and_ref_writes(tmp_path):
+    init_repo(tmp_path)
+    registry = GitRepoRegistry()
+    repo = registry.get(str(tmp_path))
+    lockFile = tmp_path.joinpath(".git", "index.lock")
+    lockFile.write_text("")
+    lockFile.unlink()
+    tmp_path.joinpath(".git", "refs", "heads", "new").write_text("0" * 40 + "\n")
+    assert registry.get(str(tmp_path)) is repo
+
+
+def test_recreated_git_folder_gets_new_handle(tmp_path):
+    init_repo(tmp_path)
+    registry = GitRepoRegistry()
+    repo = registry.get(str(tmp_path))
+    shutil.rmtree(tmp_path.joinpath(".git"))
+    init_repo(tmp_path)
+    assert registry.get(str(tmp_path)) is not repo
+
+
+def test_evicted_handle_stays_usable(tmp_path):
+    paths = [tmp_path.joinpath(name) for name in ("a", "b")]
+    for path in paths:
+        init_repo(path)
+    registry = GitRepoRegistry(maxSize=1)
+    first = registry.get(str(paths[0]))
+    registry.get(str(paths[1]))
+    assert first.git.rev_parse("--git-dir") == ".git"
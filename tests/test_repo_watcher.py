@@ -0,0 +1,29 @@
+from watchfiles import Change
+
+from repo_watcher import _watch_filter
+
+
+def test_source_files_are_watched():
+    assert _watch_filter(Change.modified, '/wc/src/model.slx')
+    assert _watch_filter(Change.added, '/wc/readme.md')
+
+
+def test_git_admin_entries():
+    assert _watch_filter(Change.modified, '/wc/.git/index')
+    assert _watch_filter(Change.modified, '/wc/.git/refs/heads/main')
+    assert not _watch_filter(Change.added, '/wc/.git/index.lock')
+    assert not _watch_filter(Change.added, '/wc/.git/objects/ab/cdef')
+
+
+def test_svn_admin_entries():
+    assert _watch_filter(Change.modified, '/wc/.svn/wc.db')
+    assert not _watch_filter(Change.modified, '/wc/.svn/pristine/ab/abc.svn-base')
+
+
+def test_build_output_and_temp_files_are_ignored():
+    assert not _watch_filter(Change.added, '/wc/slprj/ert/model/file.c')
+    assert not _watch_filter(Change.added, '/wc/tools/__pycache__/x.cpython-39.pyc')
+    assert not _watch_filter(Change.added, '/wc/model.slxc')
+    assert not _watch_filter(Change.added, '/wc/doc/~$report.docx')
+    assert not _watch_filter(Change.modified, '/wc/script.asv')
+    assert not _watch_filter(Change.added, '/wc/data.TMP')
@@ -0,0 +1,40 @@
+import json
+
+from row_index import row_index
+
+
+class fake_client():
+    def __init__(self) -> None:
+        self.patches = []
+
+    def run_javascript(self, code: str) -> None:
+        self.patches.append(json.loads(code.split('const changes = ')[1].split(';')[0]))
+
+
+class fake_table():
+    def __init__(self, rows: list) -> None:
+        self.id = 1
+        self.rows = rows
+        self.client = fake_client()
+
+    def update_rows(self, rows: list) -> None:
+        self.rows = rows
+
+
+def test_only_changed_fields_are_sent():
+    table = fake_table([{'Path': 'a', 'remoteStatus': 'Up-to-Date', 'busy': False}])
+    rows = row_index(table)
+    assert rows.update([{'Path': 'a', 'remoteStatus': 'Up-to-Date', 'busy': True}]) == 1
+    assert rows.update([{'Path': 'a', 'remoteStatus': 'Up-to-Date', 'busy': True}]) == 0
+    assert table.client.patches == [{'a': {'busy': True}}]
+
+
+def test_passive_fields_are_sent_with_next_change():
+    table = fake_table([{'Path': 'a', 'remoteStatus': 'Up-to-Date', 'stale': False, 'checkedAt': '1'}])
+    rows = row_index(table, passiveFields={'checkedAt'})
+    assert rows.update([{'Path': 'a', 'remoteStatus': 'Up-to-Date', 'stale': False, 'checkedAt': '2'}]) == 0
+    assert rows.update([{'Path': 'a', 'remoteStatus': 'Up-to-Date', 'stale': False, 'checkedAt': '3'}]) == 0
+    assert table.client.patches == []
+    assert rows.get('a')['checkedAt'] == '3'
+    assert rows.update([{'Path': 'a', 'stale': True}]) == 1
+    assert table.client.patches == [{'a': {'stale': True, 'checkedAt': '3'}}]
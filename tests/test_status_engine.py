@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+from nicegui import core
+
+import status_engine as engine_module
+from status_snapshot import status_snapshot
+
+
+class fake_engine(engine_module.status_engine):
+    def __init__(self, snapshotDir) -> None:
+        super().__init__('fake', 'Fake')
+        self.snapshot = status_snapshot('fake', snapshotDir)
+        self.refreshed = []
+        self.release = asyncio.Event()
+
+    def init_repo_row(self, r: dict) -> dict:
+        return dict(r)
+
+    async def refresh(self, repos: list):
+        self.refreshed.extend(r['Path'] for r in repos)
+        await self.release.wait()
+        for r in repos:
+            yield {'Path': r['Path'], 'remoteStatus': 'ok'}
+
+    async def refresh_local_status(self, repoPaths: list) -> None:
+        pass
+
+
+@pytest.fixture
+def no_log(monkeypatch):
+    monkeypatch.setattr(engine_module.logFile, 'enabled', False)
+
+
+def test_engine_is_abstract():
+    with pytest.raises(TypeError):
+        engine_module.status_engine('abstract', 'Abstract')
+
+
+def test_refresh_requests_join_running_refresh(tmp_path, no_log):
+    async def main():
+        core.loop = asyncio.get_running_loop()
+        engine = fake_engine(tmp_path)
+        repos = [{'Path': 'a'}, {'Path': 'b'}]
+
+        async def collect(repos):
+            return [result['Path'] async for result in engine.refresh_cycle(repos)]
+
+        first = asyncio.ensure_future(collect(repos))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(collect(repos[:1]))
+        await asyncio.sleep(0)
+        engine.release.set()
+        assert sorted(await first) == ['a', 'b']
+        assert await second == ['a']
+        assert engine.refreshed == ['a', 'b']
+        assert not engine._refreshing
+
+    asyncio.run(main())
+
+
+def test_configure_keeps_auto_update_switch(tmp_path, no_log):
+    async def main():
+        core.loop = asyncio.get_running_loop()
+        engine = fake_engine(tmp_path)
+        tableData = {'AutoUpdate': True, 'repo': [{'Path': 'a'}]}
+        engine.configure(tableData, refresh=False)
+        assert engine.autoUpdate
+        engine.autoUpdate = False
+        engine.configure(tableData, refresh=False)
+        assert not engine.autoUpdate
+        engine.configure(dict(tableData, AutoUpdateTime=60), refresh=False)
+        assert engine.autoUpdate
+
+    asyncio.run(main())
+
+
+def test_abandoned_refresh_ends_profiled_cycle(tmp_path, no_log, monkeypatch):
+    monkeypatch.setattr(engine_module.refreshProfiler, 'directory', tmp_path.joinpath('profiles'))
+    monkeypatch.setattr(engine_module.refreshProfiler, 'cycles', 1)
+
+    async def main():
+        core.loop = asyncio.get_running_loop()
+        engine = fake_engine(tmp_path)
+        engine.release.set()
+        results = engine.refresh_cycle([{'Path': 'a'}, {'Path': 'b'}])
+        await results.__anext__()
+        del results
+        # The refresh runs to its end, the profile is saved before the repositories are released
+        while engine._refreshing:
+            await asyncio.sleep(0.01)
+        assert engine_module.refreshProfiler._profile is None
+        assert len(list(tmp_path.joinpath('profiles').glob('*.prof'))) == 1
+
+    asyncio.run(main())
+
+
+def test_unchanged_configuration_is_discovered_once(tmp_path, no_log, monkeypatch):
+    scans = []
+
+    def discover(kind, roots, excludes):
+        scans.append(roots)
+        return [{'Path': 'found'}], []
+    monkeypatch.setattr(engine_module.repoDiscovery, 'discover', discover)
+
+    async def main():
+        core.loop = asyncio.get_running_loop()
+        engine = fake_engine(tmp_path)
+        tableData = {'DiscoverRoots': ['root'], 'repo': [{'Path': 'a'}]}
+        await asyncio.gather(engine.load(tableData, refresh=False), engine.load(dict(tableData), refresh=False))
+        await engine.load(tableData, refresh=False)
+        assert [r['Path'] for r in engine.repos] == ['a', 'found']
+        assert len(scans) == 1
+        await engine.load(tableData, refresh=False, rescan=True)
+        assert len(scans) == 2
+
+    asyncio.run(main())
+
+
+def test_failed_snapshot_save_is_logged(tmp_path, monkeypatch):
+    written = []
+    monkeypatch.setattr(engine_module.logFile, 'write', lambda level, message, repo=None: written.append((level, message)))
+    engine = fake_engine(tmp_path.joinpath('not_a_folder'))
+    tmp_path.joinpath('not_a_folder').write_text('')
+    engine.save_snapshot()
+    assert len(written) == 1 and written[0][0] == 'Warning'
@@ -0,0 +1,27 @@
+from status_snapshot import status_snapshot, TRANSIENT_FIELDS
+
+
+def test_round_trip_drops_transient_fields_and_marks_rows_stale(tmp_path):
+    snapshot = status_snapshot('git', tmp_path)
+    rows = [
+        {'Path': '/wc/a', 'remoteStatus': 'Up-to-Date', 'checkedAt': '2024-01-02 10:00:00',
+         'busy': True, 'stale': False, 'progress': '3 items received'},
+        {'Path': '/wc/b', 'status': 'Failed to get status', 'checkedAt': '2024-01-01 09:00:00', 'stale': True},
+        ]
+    snapshot.save(rows)
+    loaded = snapshot.load()
+    assert set(loaded) == {'/wc/a', '/wc/b'}
+    for row in loaded.values():
+        assert row['stale'] is True
+        assert not (TRANSIENT_FIELDS - {'stale'}) & set(row)
+    assert loaded['/wc/a']['remoteStatus'] == 'Up-to-Date'
+    # Time of the last successful check is kept as it is
+    assert loaded['/wc/a']['checkedAt'] == '2024-01-02 10:00:00'
+    assert loaded['/wc/b']['checkedAt'] == '2024-01-01 09:00:00'
+
+
+def test_missing_or_broken_snapshot_is_empty(tmp_path):
+    snapshot = status_snapshot('svn', tmp_path)
+    assert snapshot.load() == {}
+    snapshot.filePath.write_text('{not json', encoding='utf-8')
+    assert snapshot.load() == {}